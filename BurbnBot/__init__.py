@@ -1 +1,6 @@
+from .authors import AuthorIndex
 from .burbnbot import Burbnbot
+from .journal import Action, ActionJournal
+from .profiles import ProfileCache
+from .replay import ReplayDevice
+from .store import RelationshipStore
@@ -0,0 +1,74 @@
+import json
+import os
+import re
+import time
+from typing import List
+
+from .files import write_json
+
+#: relative time at the end of a notification, "2h", "3d", "1w"...
+_AGE_RE = re.compile(r"\s*\b\d+\s*[smhdw]\.?$")
+
+
+def signature(text: str) -> str:
+    """Text of a notification without its age, which changes every hour"""
+    return _AGE_RE.sub("", " ".join(text.split()))
+
+
+def following(previous: List[str], rows: List[str]) -> List[str]:
+    """Rows of a page that come after the previous page, in order. Unlike
+    Page.new it keeps a row whose text is also on the previous page, e.g. a
+    second "alice liked your photo", as long as it is not in the overlap.
+
+    Args:
+        previous (list): rows of the previous page, empty for the first one
+        rows (list): rows of the page
+    """
+    for k in range(min(len(previous), len(rows)), 0, -1):
+        if previous[-k:] == rows[:k]:
+            return rows[k:]
+    return list(rows)
+
+
+class ActivityWatermark(object):
+    """The newest notifications already read, so the next read stops when it
+    reaches them. The read stops only where all the rows kept show up again
+    one after the other, in the same order, so a new notification with the
+    same text as an old one ("alice liked your photo") doesn't stop it. If the
+    first of them changed since, e.g. a grouped "a, b and 3 others liked your
+    post", the read goes on to the end of the activity.
+
+    Args:
+        path (str): JSON file kept between runs, memory only if None
+        size (int): rows kept
+    """
+
+    def __init__(self, path: str = None, size: int = 3):
+        self.path = path
+        self.size = size
+        self.rows: List[str] = []  #: signatures, newest first
+        self.time: float = None  #: when it was last moved, seconds since the epoch
+        if path is not None and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.rows = data["rows"]
+            self.time = data["time"]
+
+    def reached(self, read: List[str]) -> bool:
+        """True if the rows read so far end with the watermark
+
+        Args:
+            read (list): signatures of the rows read, in screen order
+        """
+        return bool(self.rows) and read[-len(self.rows):] == self.rows
+
+    def update(self, rows: List[str]):
+        """Move the watermark to the newest rows read
+
+        Args:
+            rows (list): signatures of the first rows of the activity, newest first
+        """
+        self.rows = list(rows[:self.size])
+        self.time = time.time()
+        if self.path is not None:
+            write_json(self.path, {"rows": self.rows, "time": self.time})
@@ -0,0 +1,75 @@
+import json
+import os
+import re
+import time
+from typing import Dict, Iterable, NamedTuple, Optional
+
+from .snapshot import Node
+
+#: grid position in a thumbnail description, it changes every time a post is liked
+_POSITION_RE = re.compile(r"[\s,.]*(at )?row \d+, column \d+", re.IGNORECASE)
+
+
+def thumbnail_key(node: Node) -> Optional[str]:
+    """Identity of a grid thumbnail: its description without the grid
+    position, None if it has no description"""
+    key = _POSITION_RE.sub("", node.description).strip()
+    return key or None
+
+
+class PostAuthor(NamedTuple):
+    """Author of a post, as read when it was opened"""
+    key: str  #: see thumbnail_key
+    author: str
+    followed: bool  #: True if you followed the author then
+    time: float  #: when it was read, seconds since the epoch
+
+
+class AuthorIndex(object):
+    """Posts already opened and their author, so a thumbnail seen before is
+    resolved without tapping it. Kept in an append-only file with one JSON
+    object per line, the last line of a post wins.
+
+    Args:
+        path (str): index file, memory only if None
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self.__posts: Dict[str, PostAuthor] = {}
+        self.__file = None
+        if path is not None:
+            if os.path.exists(path):
+                for p in self.__read(path):
+                    self.__posts[p.key] = p
+            self.__file = open(path, "a", encoding="utf-8")
+
+    @staticmethod
+    def __read(path: str) -> Iterable[PostAuthor]:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield PostAuthor(**json.loads(line))
+                except (ValueError, TypeError):
+                    continue  # empty line, or the last one cut by a crash
+
+    def __len__(self) -> int:
+        return len(self.__posts)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__posts
+
+    def get(self, key: str) -> Optional[PostAuthor]:
+        return self.__posts.get(key)
+
+    def put(self, key: str, author: str, followed: bool) -> PostAuthor:
+        p = PostAuthor(key, author, followed, time.time())
+        self.__posts[key] = p
+        if self.__file is not None:
+            self.__file.write(json.dumps(p._asdict()) + "\n")
+            self.__file.flush()
+        return p
+
+    def close(self):
+        if self.__file is not None:
+            self.__file.close()
@@ -0,0 +1,418 @@
+"""Navigation cost benchmark for Burbnbot, runs offline on a ReplayDevice.
+
+For every list size a synthetic Instagram screen graph is generated
+(following/followers/hashtag lists and a feed with that many entries) and
+each public method is run against it. The report has, per method, the
+number of device RPCs, swipes, shell calls, seconds that would have been
+slept (in total and by call site, on a VirtualClock), the wall time spent in Python and, for lists, the rows read per
+swipe::
+
+    python -m BurbnBot.benchmark --sizes 100 5000 50000 --output bench.json
+    python -m BurbnBot.benchmark --sizes 100 5000 --baseline bench.json
+
+With ``--baseline`` the exit status is 1 when a method got more expensive
+than in the stored report.
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import time
+from typing import List
+from xml.sax.saxutils import quoteattr
+
+from huepy import *
+
+from .burbnbot import Burbnbot
+from .clock import VirtualClock
+from .replay import ReplayDevice
+from .session import SessionCache
+
+ID = "com.instagram.android:id/"
+PROFILE = "badgalriri"
+COLLECTION = "benchmark"
+NEW_COLLECTION = "benchmark-new"
+ROWS_PER_PAGE = 8
+COUNTED = ("rpcs", "swipes", "shell", "wait_seconds")
+
+
+def _node(rid: str = "", text: str = "", desc: str = "", cls: str = "android.widget.TextView",
+          bounds: tuple = (0, 0, 1080, 1920), children: tuple = ()) -> str:
+    return "<node resource-id={} text={} content-desc={} class={} bounds=\"[{},{}][{},{}]\">{}</node>".format(
+        quoteattr(ID + rid if rid else ""), quoteattr(text), quoteattr(desc), quoteattr(cls), *bounds,
+        "".join(children))
+
+
+def _hierarchy(*nodes: str) -> str:
+    return "<?xml version='1.0' encoding='UTF-8' standalone='yes' ?><hierarchy rotation=\"0\">{}</hierarchy>".format(
+        "".join(nodes))
+
+
+def _tab_bar() -> str:
+    tabs = [_node("tab_icon", desc="Home", bounds=(0, 1800, 216, 1920)),
+            _node("search_tab", desc="Search and Explore", bounds=(216, 1800, 432, 1920)),
+            _node("notification", desc="Activity", bounds=(648, 1800, 864, 1920)),
+            _node("profile_tab", desc="Profile", bounds=(864, 1800, 1080, 1920))]
+    return _node("tab_bar", cls="android.widget.LinearLayout", bounds=(0, 1800, 1080, 1920), children=tabs)
+
+
+def _list_page(names: List[str], top: int, row_id: str, header: tuple = (), footer: tuple = (),
+               button: str = None, title: str = None) -> str:
+    rows = []
+    for r, name in enumerate(names):
+        y = top + r * 150
+        cells = [_node("follow_list_user_imageview", cls="android.widget.ImageView", bounds=(20, y, 140, y + 140)),
+                 _node(row_id, name, bounds=(160, y + 20, 700, y + 80))]
+        if button is not None:
+            cells.append(_node("follow_button", button, desc="{} {}".format(button, name),
+                               cls="android.widget.Button", bounds=(760, y + 30, 1060, y + 110)))
+        rows.append(_node("follow_list_container", cls="android.widget.LinearLayout", bounds=(0, y, 1080, y + 140),
+                          children=cells))
+    nodes = [_node("action_bar_textview_title", title, bounds=(100, 60, 700, 140))] if title else []
+    return _hierarchy(*nodes, *header, *rows, *footer, _tab_bar())
+
+
+def _add_list(dev: ReplayDevice, prefix: str, names: List[str], top: int, row_id: str, header: tuple = (),
+              footer: tuple = (), button: str = None, title: str = None) -> str:
+    """Add the pages of a scrolling list, each swipe moves ROWS_PER_PAGE - 1 rows
+    (the last row of a page is the first of the next one), returns the first page"""
+    step = ROWS_PER_PAGE - 1
+    starts = list(range(0, max(len(names) - 1, 1), step))
+    for p, start in enumerate(starts):
+        last = p == len(starts) - 1
+        chunk = names[start:start + ROWS_PER_PAGE]
+
+        def page(chunk=chunk, head=header if p == 0 else (), foot=footer if last else ()):
+            return _list_page(chunk, top, row_id, head, foot, button, title)
+
+        dev.add_screen("{}_{}".format(prefix, p), page)
+        if not last:
+            dev.add_transition("{}_{}".format(prefix, p), "swipe", "up", "{}_{}".format(prefix, p + 1))
+    return "{}_0".format(prefix)
+
+
+def _feed_page(i: int, liked: bool, sponsored: bool) -> str:
+    post = [_node("row_feed_photo_profile_name", "author{} ".format(i), bounds=(160, 160, 700, 220)),
+            _node("row_feed_photo_imageview", desc="Photo by author{}".format(i), cls="android.widget.ImageView",
+                  bounds=(0, 240, 1080, 1320)),
+            _node("row_feed_button_like", desc="Liked" if liked else "Like", cls="android.widget.ImageView",
+                  bounds=(20, 1340, 120, 1440)),
+            _node("row_feed_button_save", desc="Add to Saved", cls="android.widget.ImageView",
+                  bounds=(960, 1340, 1060, 1440))]
+    if sponsored:
+        post.append(_node("secondary_label", "Sponsored", bounds=(160, 200, 400, 230)))
+    return _hierarchy(_node("refreshable_container", cls="android.widget.FrameLayout", bounds=(0, 140, 1080, 1800),
+                            children=post), _tab_bar())
+
+
+def synthetic_device(size: int) -> ReplayDevice:
+    """Build a ReplayDevice whose following, followers and followed hashtags
+    lists and feed have ``size`` entries
+
+    Args:
+        size (int): number of entries of each list
+    """
+    dev = ReplayDevice(start="home")
+    following = ["following{}".format(i) for i in range(size)]
+    followers = ["follower{}".format(i) for i in range(size)]
+    hashtags = ["tag{}".format(i) for i in range(size)]
+
+    dev.add_screen("home", lambda: _feed_page(-1, False, False))
+    dev.add_screen("profile", lambda: _hierarchy(
+        _node("action_bar_textview_title", "me", bounds=(100, 60, 700, 140)),
+        _node(desc="Options", cls="android.widget.ImageView", bounds=(960, 60, 1060, 140)),
+        _node("row_profile_header_followers_container", cls="android.widget.LinearLayout",
+              bounds=(400, 200, 700, 340), children=[
+                _node("row_profile_header_textview_followers_count", str(size), bounds=(450, 210, 650, 270))]),
+        _node("row_profile_header_following_container", cls="android.widget.LinearLayout",
+              bounds=(700, 200, 1000, 340), children=[
+                _node("row_profile_header_textview_following_count", str(size), bounds=(750, 210, 950, 270))]),
+        _tab_bar()))
+
+    search = _node("row_search_edit_text", cls="android.widget.EditText", bounds=(0, 160, 1080, 260))
+    sort = _node("sorting_entry_row_option", "Sorted by Default", cls="android.widget.LinearLayout",
+                 bounds=(0, 340, 1080, 440), children=[
+                    _node("sorting_entry_row_icon", cls="android.widget.ImageView", bounds=(960, 350, 1040, 430))])
+    hashtag_row = _node("row_hashtag_image", cls="android.widget.ImageView", bounds=(20, 270, 120, 330))
+    first = _add_list(dev, "following", following, 460, "follow_list_username",
+                      footer=(_node(text="Suggestions for you", bounds=(0, 1660, 1080, 1720)),))
+    dev.add_screen("following_head", lambda: _list_page(following[:ROWS_PER_PAGE], 460, "follow_list_username",
+                                                        (search, hashtag_row, sort)))
+    dev.add_transition("following_head", "swipe", "up", first)
+    dev.add_screen("sort_sheet", lambda: _hierarchy(*[
+        _node("follow_list_sorting_option_radio_button", cls="android.widget.RadioButton",
+              bounds=(0, 1200 + 150 * i, 1080, 1340 + 150 * i)) for i in range(3)]))
+    dev.add_transition("following_head", "click", {"resourceId": ID + "sorting_entry_row_icon"}, "sort_sheet")
+    dev.add_transition("sort_sheet", "click", {"resourceId": ID + "follow_list_sorting_option_radio_button"},
+                       "following_head")
+
+    first = _add_list(dev, "followers", followers, 300, "follow_list_username", header=(search,),
+                      footer=(_node("row_header_textview", "Suggestions for you", bounds=(0, 1660, 1080, 1720)),))
+    dev.add_transition("profile", "click", {"resourceId": ID + "row_profile_header_followers_container"}, first)
+    dev.add_transition("profile", "click", {"resourceId": ID + "row_profile_header_following_container"},
+                       "following_head")
+
+    first = _add_list(dev, "hashtags", hashtags, 160, "follow_list_username", button="Following", title="Hashtags",
+                      footer=(_node("row_header_textview", "Suggestions", bounds=(0, 1660, 1080, 1720)),))
+    dev.add_transition("following_head", "click", {"resourceId": ID + "row_hashtag_image"}, first)
+
+    # unfollow searches the following list, the result row shows the last text typed
+    def result(button):
+        typed = next((c.detail[-1] for c in reversed(dev.calls) if c.kind.endswith("send_keys")), "")
+        return _hierarchy(search, _node("follow_list_username", typed, bounds=(160, 300, 700, 360)),
+                          _node("button", button, cls="android.widget.Button", bounds=(760, 300, 1060, 380)),
+                          _tab_bar())
+
+    dev.add_screen("search_result", lambda: result("Following"))
+    dev.add_screen("search_done", lambda: result("Follow"))
+    for src in ("following_head", "search_result", "search_done"):
+        dev.add_transition(src, "send_keys", ".", "search_result")
+    dev.add_transition("search_result", "click", {"resourceId": ID + "button", "text": "Following"}, "search_done")
+
+    # feed used by like_n_swipe, one post per scroll position, every sixth is sponsored and
+    # skipped, so there are enough posts for like_n_swipe(size)
+    posts = 2 * size + 10
+    for i in range(posts):
+        sponsored = i % 6 == 5
+        dev.add_screen("feed_{}".format(i), lambda i=i, s=sponsored: _feed_page(i, False, s))
+        dev.add_screen("feed_{}_liked".format(i), lambda i=i, s=sponsored: _feed_page(i, True, s))
+        dev.add_transition("feed_{}".format(i), "click", {"resourceId": ID + "row_feed_button_like"},
+                           "feed_{}_liked".format(i))
+        if i + 1 < posts:
+            for src in ("feed_{}".format(i), "feed_{}_liked".format(i)):
+                dev.add_transition(src, "swipe", "up", "feed_{}".format(i + 1))
+    dev.add_transition(None, "long_click", {"resourceId": ID + "row_feed_button_save"}, "collections_0")
+
+    # hashtag grid and profile deep links
+    dev.add_screen("tag_grid", lambda: _hierarchy(
+        _node(text="Top", bounds=(0, 400, 540, 480)), _node(text="Recent", bounds=(540, 400, 1080, 480)),
+        _node("hashtag_media_count", "{} posts".format(size), bounds=(300, 200, 700, 260)),
+        _node("image_button", cls="android.widget.ImageView", bounds=(0, 500, 360, 860)), _tab_bar()))
+    dev.add_transition(None, "shell", r"instagram\.com/explore/tags/", "tag_grid")
+    dev.add_transition("tag_grid", "click", {"resourceId": ID + "image_button"}, "feed_0")
+    grid = _node("profile_viewpager", cls="androidx.viewpager.widget.ViewPager", bounds=(0, 700, 1080, 1800),
+                 children=[_node("media_set_row_content_identifier", cls="android.widget.LinearLayout",
+                                 bounds=(0, 700, 1080, 1060), children=[
+                                    _node(cls="android.widget.ImageView", desc="Photo by {}".format(PROFILE),
+                                          bounds=(360 * c, 700, 360 * c + 358, 1060)) for c in range(3)])])
+    def other_profile():
+        followed = "other_profile_followed" in dev.history
+        counts = [_node("row_profile_header_textview_{}_count".format(c), n, bounds=(300 + 250 * i, 210, 500 + 250 * i, 270))
+                  for i, (c, n) in enumerate((("post", "3"), ("followers", "103M"), ("following", "1,234")))]
+        return _hierarchy(
+            _node("action_bar_textview_title", PROFILE, bounds=(100, 60, 700, 140)), *counts,
+            _node("profile_header_follow_button", "Following" if followed else "Follow", cls="android.widget.Button",
+                  bounds=(40, 560, 1040, 640)), grid, _tab_bar())
+
+    dev.add_screen("other_profile", other_profile)
+    dev.add_screen("other_profile_followed", other_profile)
+    dev.add_transition(None, "shell", r"instagram\.com/{}/".format(PROFILE), "other_profile")
+    for src in ("other_profile", "other_profile_followed"):
+        dev.add_transition(src, "click", {"className": "android.widget.ImageView"}, "feed_0")
+    dev.add_transition("other_profile", "click", {"text": "Follow"}, "other_profile_followed")
+
+    # save to collection picker, four collections per horizontal page, a collection created
+    # with the new collection button is shown first
+    collections = ["collection{}".format(i) for i in range(20)]
+    collections.insert(10, COLLECTION)
+
+    def picker(p: int) -> str:
+        names = ([NEW_COLLECTION] if "new_collection" in dev.history else []) + collections
+        names = names[3 * p:3 * p + 4]
+        return _hierarchy(
+            _node("save_to_collection_new_collection_button", cls="android.widget.ImageView",
+                  bounds=(960, 1300, 1060, 1400)),
+            *[_node("selectable_image", cls="android.widget.ImageView", bounds=(20 + 260 * c, 1450, 260 + 260 * c, 1690))
+              for c in range(len(names))],
+            *[_node("collection_name", n, bounds=(20 + 260 * c, 1700, 260 + 260 * c, 1760))
+              for c, n in enumerate(names)])
+
+    pages = (len(collections) + 1) // 3
+    for p in range(pages):
+        dev.add_screen("collections_{}".format(p), lambda p=p: picker(p))
+        if p + 1 < pages:
+            dev.add_transition("collections_{}".format(p), "swipe", "left", "collections_{}".format(p + 1))
+    dev.add_screen("new_collection", lambda: _hierarchy(
+        _node("create_collection_edit_text", cls="android.widget.EditText", bounds=(0, 1300, 1080, 1400)),
+        _node("save_to_collection_action_button", "Done", cls="android.widget.Button", bounds=(800, 1450, 1060, 1550))))
+    dev.add_transition(None, "click", {"resourceId": ID + "save_to_collection_new_collection_button"},
+                       "new_collection")
+    dev.add_transition("new_collection", "click", {"resourceId": ID + "save_to_collection_action_button"}, "feed_0")
+    dev.add_transition(None, "click", {"resourceId": ID + "collection_name"}, "feed_0")
+
+    # Settings > Account > Posts You've Liked, a grid of size posts by size // 3 authors, every
+    # fourth author followed, each thumbnail opens its post and back returns to the same page
+    dev.add_screen("options", lambda: _hierarchy(_node("menu_settings_row", "Settings", bounds=(0, 1500, 1080, 1600))))
+    dev.add_screen("settings", lambda: _hierarchy(
+        _node("row_simple_text_textview", "Account", bounds=(0, 300, 1080, 400))))
+    dev.add_screen("account", lambda: _hierarchy(
+        _node("row_simple_text_textview", "Posts You've Liked", bounds=(0, 300, 1080, 400))))
+    dev.add_transition("profile", "click", {"description": "Options"}, "options")
+    dev.add_transition("options", "click", {"resourceId": ID + "menu_settings_row"}, "settings")
+    dev.add_transition("settings", "click", {"text": "Account"}, "account")
+    dev.add_transition("account", "click", {"text": "Posts You've Liked"}, "liked_0")
+    authors = max(size // 3, 1)
+    liked = ["Photo by author{} on post {} at Row {}, Column {}".format(k % authors, k, k // 3 + 1, k % 3 + 1)
+             for k in range(size)]
+    grid_rows = [list(range(i, min(i + 3, size))) for i in range(0, size, 3)]
+    starts = list(range(0, max(len(grid_rows) - 1, 1), 3))
+    for p, start in enumerate(starts):
+        chunk = grid_rows[start:start + 4]
+        dev.add_screen("liked_{}".format(p), lambda chunk=chunk: _hierarchy(*[
+            _node("media_set_row_content_identifier", cls="android.widget.LinearLayout",
+                  bounds=(0, 200 + 360 * r, 1080, 558 + 360 * r), children=[
+                    _node(cls="android.widget.ImageView", desc=liked[k],
+                          bounds=(360 * c, 200 + 360 * r, 360 * c + 358, 558 + 360 * r)) for c, k in enumerate(row)])
+            for r, row in enumerate(chunk)], _tab_bar()))
+        if p + 1 < len(starts):
+            dev.add_transition("liked_{}".format(p), "swipe", "up", "liked_{}".format(p + 1))
+        for row in chunk:
+            for k in row:
+                post = "liked_{}_post_{}".format(p, k)
+                dev.add_screen(post, lambda k=k: _hierarchy(
+                    _node("row_feed_photo_profile_name", "author{} ".format(k % authors), bounds=(160, 160, 700, 220)),
+                    _node("button", "Following" if (k % authors) % 4 == 0 else "Follow", cls="android.widget.Button",
+                          bounds=(760, 160, 1060, 220))))
+                dev.add_transition("liked_{}".format(p), "click", {"description": liked[k]}, post)
+                dev.add_transition(post, "press", "back", "liked_{}".format(p))
+
+    # activity, newest first
+    activity = ["user{} liked your photo. {}h".format(i, i + 1) for i in range(size)]
+    first = _add_list(dev, "activity", activity, 160, "row_text",
+                      footer=(_node(text="Suggestions for you", bounds=(0, 1660, 1080, 1720)),))
+    dev.add_transition(None, "click", {"resourceId": ID + "notification"}, first)
+
+    dev.add_transition(None, "click", {"resourceId": ID + "profile_tab"}, "profile")
+    dev.add_transition(None, "click", {"resourceId": ID + "tab_icon"}, "home")
+    dev.add_transition(None, "press", "back", "home")
+    return dev
+
+
+def _scenarios(size: int, dev: ReplayDevice) -> list:
+    """(name, call) in the order they run, some calls depend on the screen left by the previous one"""
+    return [
+        ("startup", lambda bot: bot.ensure_ready()),
+        # another bot on the same device: cached checks, the app is already on a healthy screen
+        ("startup_again", lambda bot: Burbnbot(device=dev, session=bot.session, clock=bot.clock).ensure_ready()),
+        ("get_following_list", lambda bot: bot.get_following_list()),
+        ("get_followers_list", lambda bot: bot.get_followers_list()),
+        ("get_followed_hashtags", lambda bot: bot.get_followed_hashtags()),
+        ("unfollow", lambda bot: bot.unfollow(username="following0")),
+        ("bulk_unfollow", lambda bot: bot.bulk_unfollow(["following{}".format(i) for i in range(10)])),
+        ("open_tag", lambda bot: bot.open_tag(tag="benchmark", tab="Recent")),
+        ("like_n_swipe", lambda bot: bot.like_n_swipe(amount=size)),
+        ("open_profile", lambda bot: bot.open_profile(username=PROFILE, open_post=True)),
+        ("save_user", lambda bot: bot.save_user(username=PROFILE, colletion=COLLECTION)),
+        ("save_user_again", lambda bot: bot.save_user(username=PROFILE, colletion=COLLECTION)),
+        ("save_user_new_collection", lambda bot: bot.save_user(username=PROFILE, colletion=NEW_COLLECTION)),
+        ("save_user_new_collection_again", lambda bot: bot.save_user(username=PROFILE, colletion=NEW_COLLECTION)),
+        ("follow", lambda bot: bot.follow(username=PROFILE)),
+        # like, follow and save opening the profile once
+        ("visit_profile", lambda bot: bot.visit_profile(PROFILE, likes=3, follow=True, save=COLLECTION)),
+        ("get_notification_users", lambda bot: bot.get_notification_users()),
+        ("get_new_notification_users", lambda bot: bot.get_notification_users(new_only=True)),
+        # nothing happened since, only the first page is read
+        ("get_new_notification_users_again", lambda bot: bot.get_notification_users(new_only=True)),
+        ("get_users_liked_by_you", lambda bot: bot.get_users_liked_by_you(amount=size)),
+        # the posts are resolved from the author index now
+        ("get_users_liked_by_you_again", lambda bot: bot.get_users_liked_by_you(amount=size)),
+    ]
+
+
+def run(sizes: List[int], seed: int = 0) -> dict:
+    """Run every scenario for each size and return the report
+
+    Args:
+        sizes (list): list sizes to benchmark
+        seed (int): seed of the random waits
+    """
+    report = {"version": 1, "sizes": {}}
+    for size in sizes:
+        dev = synthetic_device(size)
+        results = {}
+        clock = VirtualClock()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            bot = Burbnbot(device=dev, session=SessionCache(), clock=clock)
+            for name, call in _scenarios(size, dev):
+                random.seed(seed)
+                dev.reset_calls()
+                slept, sites = clock.elapsed, dict(clock.sites)
+                bot.scroller.stats = {}
+                start = time.perf_counter()
+                r = call(bot)
+                wall = time.perf_counter() - start
+                scrolled = bot.scroller.stats.values()
+                swipes = sum(st.swipes for st in scrolled)
+                results[name] = {
+                    "rpcs": dev.rpc_count,
+                    "swipes": dev.count("swipe"),
+                    "shell": dev.count("shell"),
+                    "wait_seconds": clock.elapsed - slept,
+                    "wall_seconds": round(wall, 4),
+                    "items": len(r) if isinstance(r, (list, dict)) else None,
+                    "rows_per_swipe": round(sum(st.rows for st in scrolled) / swipes, 2) if swipes else None,
+                    # seconds slept by call site
+                    "sleeps": {k: round(v - sites.get(k, 0.0), 3) for k, v in clock.report().items()
+                               if v - sites.get(k, 0.0) > 0},
+                }
+        report["sizes"][str(size)] = results
+    return report
+
+
+def compare(current: dict, baseline: dict, tolerance: float = 0.0, wall_tolerance: float = 1.0) -> list:
+    """Return a list of regressions of current against baseline
+
+    Args:
+        current (dict): report returned by run
+        baseline (dict): stored report
+        tolerance (float): allowed relative increase of RPCs, swipes, shell
+            calls and waits
+        wall_tolerance (float): allowed relative increase of wall time
+    """
+    regressions = []
+    for size, methods in current["sizes"].items():
+        for method, m in methods.items():
+            b = baseline.get("sizes", {}).get(size, {}).get(method)
+            if b is None:
+                continue
+            for key in COUNTED + ("wall_seconds",):
+                allowed = b[key] * (1 + (wall_tolerance if key == "wall_seconds" else tolerance))
+                if m[key] > allowed and m[key] - b[key] > 1e-9:
+                    regressions.append("{} [{}] {}: {} -> {}".format(method, size, key, b[key], m[key]))
+    return regressions
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Burbnbot navigation cost benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 5000], help="list sizes to benchmark")
+    parser.add_argument("--output", type=str, help="write the JSON report to this file")
+    parser.add_argument("--baseline", type=str, help="JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.0,
+                        help="allowed relative increase of rpcs, swipes, shell calls and waits")
+    parser.add_argument("--wall-tolerance", type=float, default=1.0, help="allowed relative increase of wall time")
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance, args.wall_tolerance)
+        for r in regressions:
+            print(bad("Regression: {}".format(r)), file=sys.stderr)
+        if regressions:
+            return 1
+        print(good("No regressions against {}".format(args.baseline)), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
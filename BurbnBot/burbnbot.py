@@ -1,87 +1,365 @@
 import argparse
+import atexit
 import datetime
+import functools
+import inspect
+import itertools
 import random
 import sys
-from time import sleep
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Union
 
 import loguru
 import uiautomator2
 from huepy import *
 
-
-class MediaType(object):
-    """Type of medias on Instagram"""
-    PHOTO: int = 1  #: Photo media type
-    VIDEO: int = 2  #: Video media type
-    CAROUSEL: int = 8  #: A album with photos and/or videos
+from . import logs, tracing
+from .activity import ActivityWatermark, following, signature
+from .authors import AuthorIndex, PostAuthor, thumbnail_key
+from .capture import FailureCapture
+from .clock import Clock, VirtualClock, delay
+from .feed import FeedWalker, MediaType, Post
+from .journal import Action, ActionJournal
+from .metrics import InstrumentedDevice, Metrics, instrument
+from .navigation import Navigator
+from .profiles import Profile, ProfileCache
+from .replay import ReplayDevice
+from .saved import SavedCollections
+from .screens import WRONG_PLACE, ScreenType, classify, title
+from .scroll import Page, Scroller
+from .session import SESSIONS, SessionCache
+from .snapshot import Node, ScreenSnapshot
+from .store import FOLLOWERS, FOLLOWING, RelationshipStore
+from .usernames import snapshot_path, write_usernames
+from .versions import Selectors, for_version
+from .waits import Waiter
+
+
+#: public methods that run without ensure_ready, they don't need the app, start it themselves or are used by it
+_NO_STARTUP = frozenset(("ensure_ready", "login", "profile", "snapshot", "screen", "wait"))
+
+
+def _ready_first(cls):
+    """Class decorator making the public methods run ensure_ready before
+    their first device call, until it succeeded. A method that returns
+    without reaching the device, e.g. everything it would do is in the
+    journal, doesn't start the app."""
+    for name, fn in list(vars(cls).items()):
+        if name.startswith("_") or name in _NO_STARTUP or not inspect.isfunction(fn):
+            continue
+        if inspect.isgeneratorfunction(fn):
+            def wrapper(self, *args, fn=fn, **kwargs):
+                self._commands += 1
+                try:
+                    yield from fn(self, *args, **kwargs)
+                finally:
+                    self._commands -= 1
+        else:
+            def wrapper(self, *args, fn=fn, **kwargs):
+                self._commands += 1
+                try:
+                    return fn(self, *args, **kwargs)
+                finally:
+                    self._commands -= 1
+        setattr(cls, name, functools.wraps(fn)(wrapper))
+    return cls
 
 
+@instrument
+@_ready_first
 class Burbnbot:
-    d: uiautomator2.Device
+    d: Union[uiautomator2.Device, ReplayDevice]
     version_app: str = "158.0.0.30.123"
     version_android: str = "9"
     lg: loguru.logger = loguru.logger
-
-    def __init__(self, device: str = None) -> None:
+    store: RelationshipStore = None
+    journal: ActionJournal = None
+    profiles: ProfileCache
+    authors: AuthorIndex
+    collections: SavedCollections
+    activity: ActivityWatermark
+    snapshot_dir: str = None
+    metrics: Metrics
+    nav: Navigator
+    waiter: Waiter
+    scroller: Scroller
+    captures: FailureCapture
+    session: SessionCache
+    clock: Clock
+    ready: bool  #: ensure_ready succeeded, with the login checked
+
+    def __init__(self, device: Union[str, uiautomator2.Device, ReplayDevice] = None,
+                 store: RelationshipStore = None, journal: ActionJournal = None,
+                 profiles: ProfileCache = None, snapshot_dir: str = None, metrics_dir: str = None,
+                 trace: str = None, capture_dir: str = "log/failures", authors: AuthorIndex = None,
+                 collections: SavedCollections = None, activity: ActivityWatermark = None,
+                 session: SessionCache = None, clock: Clock = None) -> None:
         """
         Args:
-            device (str): Device serial number, use 'adb devices' to a list of
-                connected devices
+            device (str, uiautomator2.Device or ReplayDevice): Device serial
+                number, use 'adb devices' to a list of connected devices, or an
+                already connected device backend (e.g. a ReplayDevice)
+            store (RelationshipStore): where following/followers scrapes are
+                checkpointed and kept between runs
+            journal (ActionJournal): likes, follows, unfollows and saves
+                already done, they are skipped when a job is run again
+            profiles (ProfileCache): profiles read recently, pass one with a
+                path to keep it between runs
+            snapshot_dir (str): directory where each complete following and
+                followers scrape is written as a dated username snapshot, see
+                BurbnBot.usernames
+            metrics_dir (str): directory where burbnbot.prom and
+                burbnbot.json are written when the process exits, see
+                BurbnBot.metrics
+            trace (str): file a Chrome trace-event timeline of the run is
+                written to when the process exits, see BurbnBot.tracing.
+                Also set with --trace on the command line.
+            capture_dir (str): directory where the screenshot and hierarchy
+                of the screens where an operation failed are written, in the
+                background, see BurbnBot.capture
+            authors (AuthorIndex): authors of the posts you liked already
+                opened, pass one with a path to keep it between runs
+            collections (SavedCollections): positions of the collections in
+                the save picker, pass one with a path to keep it between runs
+            activity (ActivityWatermark): newest notifications read by
+                get_notification_users(new_only=True), pass one with a path
+                to keep it between runs
+            session (SessionCache): startup checks of the devices, shared by
+                the bots of the process if None, pass one with a path to keep
+                them between runs
+            clock (Clock): where every delay of the bot goes, a
+                VirtualClock (no real sleeping) for a ReplayDevice if None,
+                see BurbnBot.clock
         """
-
-        self.lg.add("log/{}.log".format(str(datetime.date.today())), level="DEBUG")
+        started = time.perf_counter()
+        self.metrics = Metrics()
+        self.__started: Dict[tuple, float] = {}
+        if metrics_dir is not None:
+            atexit.register(self.metrics.export, metrics_dir)
+        self.store = store
+        self.journal = journal
+        self.profiles = ProfileCache() if profiles is None else profiles
+        self.authors = AuthorIndex() if authors is None else authors
+        self.collections = SavedCollections() if collections is None else collections
+        self.activity = ActivityWatermark() if activity is None else activity
+        self.snapshot_dir = snapshot_dir
+        self.session = SESSIONS if session is None else session
+        self.__sel: Selectors = None
+        self.ready = False
+        self.__starting = False
+        self._commands = 0  # public methods running, see _ready_first
+
+        logs.setup("log")
 
         if device is None:
             parser = argparse.ArgumentParser(add_help=True)
             parser.add_argument("-d", "--device", type=str, default=device, help="Device serial number", required=False)
-            args = parser.parse_args()
+            parser.add_argument("--trace", type=str, default=trace, help="write a Chrome trace-event file",
+                                required=False)
+            args, _ = parser.parse_known_args()
             device_addr = args.device
+            trace = args.trace
         else:
             device_addr = device
 
-        self.d = uiautomator2.connect(addr=device_addr)
+        if trace is not None:
+            tracing.start(trace)
 
-        if len(self.d.app_list("com.instagram.android")) == 0:
-            msg = "Instagram not installed."
-            print(bad(msg))
-            self.lg.error(msg)
-            quit()
+        if device_addr is None or isinstance(device_addr, str):
+            d = uiautomator2.connect(addr=device_addr)
+        else:
+            d = device_addr
+        self.metrics.labels["device"] = getattr(d, "serial", None) or "default"
+        self.d = InstrumentedDevice(d, self.metrics, before=self.__reach)
+        if clock is None:
+            clock = VirtualClock() if isinstance(d, ReplayDevice) else Clock()
+        self.clock = clock
+        # captures use the bare device, their calls are not part of the run's metrics
+        self.captures = FailureCapture(d, capture_dir)
+        self.waiter = Waiter(self.d, sleep=self.__poll)
+        self.nav = Navigator(self.d, self.waiter)
+        self.scroller = Scroller(self.d)
+        self.metrics.startup += time.perf_counter() - started
+
+    def __reach(self):
+        """Called before every device call, starts the app the first time a
+        public method reaches the device"""
+        if not self.ready and self._commands and not self.__starting:
+            self.ensure_ready()
+
+    @property
+    def sel(self) -> Selectors:
+        """Selectors of the installed Instagram version, runs ensure_ready if
+        no method did yet"""
+        if self.__sel is None:
+            self.ensure_ready()
+        return self.__sel
+
+    def ensure_ready(self, logged_in: bool = True):
+        """Check that Instagram is installed, pick the selectors of its
+        version, start it unless it is already on a healthy screen and check
+        that an account is logged in. Quits if it is not installed or logged
+        out. The install and version of the device are kept in self.session,
+        a bot created again on the same device skips those checks. Run before
+        the first device call of a public method until it succeeded, call it
+        to choose when the startup happens.
 
-        self.d.app_stop_all()
+        Args:
+            logged_in (bool): check the login too, False before login()
+        """
+        if self.__sel is not None and (self.ready or not logged_in):
+            return
+        started = time.perf_counter()
+        # its own device calls don't start it again
+        self.__starting = True
+        try:
+            self.__start(logged_in)
+        finally:
+            self.__starting = False
+        self.metrics.startup += time.perf_counter() - started
+
+    def __start(self, logged_in: bool):
+        serial = self.metrics.labels["device"]
+        with tracing.span("ensure ready", "nav") as span:
+            check = self.session.get(serial)
+            span.set(cached=check is not None)
+            if check is None:
+                if len(self.d.app_list("com.instagram.android")) == 0:
+                    msg = "Instagram not installed."
+                    print(bad(msg))
+                    self.lg.error(msg)
+                    quit()
+                version = self.d.app_info(package_name="com.instagram.android")['versionName']
+            else:
+                version = check.version
+
+            if self.__sel is None:
+                self.__sel = for_version(version)
+                self.nav.sel = self.__sel
+                if not self.__sel.exact:
+                    print(info("You are using a different version than the recommended one, this can generate "
+                               "unexpected errors."))
+                    self.lg.warning(
+                        "No selectors for this Instagram version, using those of {}".format(self.__sel.version))
+
+            s = None
+            if self.nav.in_foreground():
+                s = self.snapshot()
+                screen = self.screen(s)
+                if screen in (ScreenType.NONE, ScreenType.UNKNOWN, ScreenType.DIALOG, ScreenType.RATE_LIMITED):
+                    span.set(restart=screen)
+                    s = self.nav.restart()
+            else:
+                # nothing to stop, a cold start is clean already
+                s = self.nav.start()
+
+            if logged_in:
+                # None if the app didn't show a known screen in time, the login is checked on what is there
+                screen = self.screen(s)
+                if screen in (ScreenType.LOGGED_OUT, ScreenType.LOGIN):
+                    self.session.forget(serial)
+                    msg = "You've Been Logged Out. Please log back in."
+                    print(bad(msg))
+                    self.lg.error(msg)
+                    self.d.app_clear(package_name="com.instagram.android")
+                    quit()
+                self.ready = True
+            # logged_in is only kept when the login was seen on a ready screen
+            verified = logged_in and s is not None
+            if check is None or (verified and not check.logged_in):
+                self.session.put(serial, version, verified)
+
+    def snapshot(self) -> ScreenSnapshot:
+        """Dump the current screen once and return a local index of it, use
+        it instead of several ``self.d(...)`` queries on the same screen state.
+        """
+        return ScreenSnapshot.from_device(self.d)
 
-        self.d.app_start(package_name="com.instagram.android")
+    def screen(self, s: ScreenSnapshot = None) -> str:
+        """Which screen is shown, one of ScreenType
 
-        if not self.d.app_info(package_name="com.instagram.android")['versionName'] == self.version_app:
-            print(info(
-                "You are using a different version than the recommended one, this can generate unexpected errors."))
-
-        if self.d(resourceId="com.instagram.android:id/default_dialog_title").exists:
-            ri = "com.instagram.android:id/default_dialog_title"
-            if self.d(resourceId=ri).get_text() == "You've Been Logged Out":
-                msg = "You've Been Logged Out. Please log back in."
-                print(bad(msg))
-                self.lg.error(msg)
-                self.d.app_clear(package_name="com.instagram.android")
-                quit()
-
-        if self.d(resourceId="com.instagram.android:id/login_username").exists:
-            msg = "You've Been Logged Out. Please log back in."
-            print(bad(msg))
-            self.lg.error(msg)
-            self.d.app_clear(package_name="com.instagram.android")
-            quit()
+        Args:
+            s (ScreenSnapshot): screen to classify, dumped if None
+        """
+        return classify(self.snapshot() if s is None else s, self.sel)
 
-    def __reset_app(self):
-        print(good("Restarting app"))
-        self.d.app_stop_all()
-        self.wait()
-        self.d.app_start(package_name="com.instagram.android")
-        self.wait()
+    def __tap(self, node: Node):
+        """Click the center of a node taken from a snapshot
+
+        Args:
+            node (Node): Element
+        """
+        self.d.click(*node.center())
+
+    @staticmethod
+    def __unseen(items: List[str], seen: dict) -> List[str]:
+        """Items not in seen, in order and without duplicates, seen is updated
+
+        Args:
+            items (list): items read from the screen
+            seen (dict): insertion-ordered set of items already returned
+        """
+        new = [i for i in dict.fromkeys(items) if i not in seen]
+        seen.update(dict.fromkeys(new))
+        return new
+
+    def __done(self, action: str, target: str):
+        """Result of an action already in the journal, None if it must be done.
+        The action is timed from here until __record."""
+        e = None
+        if self.journal is not None and target is not None:
+            e = self.journal.get(action, target)
+        if e is None:
+            self.__started[(action, target)] = time.perf_counter()
+            return None
+        self.__event(action, target, "skipped")
+        return e.result
+
+    def __record(self, action: str, target: str, result):
+        """Journal an action if it succeeded, returns result"""
+        if self.journal is not None and target is not None and result:
+            self.journal.record(action, target, result)
+        start = self.__started.pop((action, target), None)
+        self.__event(action, target, "done" if result else "failed",
+                     None if start is None else time.perf_counter() - start)
+        return result
+
+    def __event(self, action: str, target: str, outcome: str, duration: float = None):
+        logs.event(action, target, outcome, duration, device=self.metrics.labels.get("device"))
+
+    def __save_usernames(self, kind: str, usernames: Iterable[str]):
+        """Write today's snapshot of a complete list, if snapshot_dir is set
+
+        Args:
+            kind (str): FOLLOWING or FOLLOWERS
+            usernames (iterable): the whole list
+        """
+        if self.snapshot_dir is not None:
+            path = snapshot_path(self.snapshot_dir, kind)
+            self.lg.info("{} usernames written to {}".format(write_usernames(path, usernames), path))
 
     def __treat_exception(self, e: Exception):
-        self.d.screenshot("log/{}.jpg".format(datetime.datetime.now().strftime("%Y-%m-%d_-_%H_%M_%S-%f%z")))
+        # the method that failed, the label of the capture
+        self.captures.capture(e, sys._getframe(1).f_code.co_name)
         self.lg.exception(e)
 
+    @delay
+    def __sleep(self, seconds: float, source: str):
+        """Sleep on self.clock and count it in metrics
+
+        Args:
+            seconds (float): time to sleep
+            source (str): what the sleep is for, a label of the metric
+        """
+        self.metrics.slept(source, seconds)
+        self.clock.sleep(seconds)
+
+    @delay
+    def __poll(self, seconds: float):
+        """Sleep between two polls of self.waiter"""
+        self.__sleep(seconds, "poll")
+
+    @delay
     def wait(self, i: int = None, muted=False):
         """Wait the device :param i: number of seconds to wait, if None will be
         a random number between 1 and 3 :type i: int
@@ -92,13 +370,29 @@ class Burbnbot:
         if i is None:
             i = random.randint(1, 3)
         if muted:
-            sleep(i)
+            self.__sleep(i, "wait")
         else:
             for remaining in range(i, 0, -1):
                 print(run('Waiting for {} seconds.'.format(remaining)), end='\r', flush=True)
-                sleep(1)
+                self.__sleep(1, "wait")
             sys.stdout.write("\033[K")  # Clear to the end of line
 
+    @staticmethod
+    def __complete(page: Optional[Page], count: str, read: int) -> bool:
+        """True if a list was read to its end: its footer showed up, or it
+        stopped scrolling with as many users read as its header count, when
+        the count is exact (not rounded like 12.3K)
+
+        Args:
+            page (Page): last page of the list, None if there was none
+            count (str): count shown in the profile header
+            read (int): users read
+        """
+        if page is None:
+            return False
+        count = count.strip().replace(",", "")
+        return page.end or (count.isdigit() and read >= int(count))
+
     def __str_to_number(self, n: str):
         """format (string) numbers in thousands, million or billions :param n:
         string to convert :type n: str
@@ -109,93 +403,107 @@ class Burbnbot:
         n = n.strip().replace(",", "")
         num_map = {'K': 1000, 'M': 1000000, 'B': 1000000000}
         if n.isdigit():
-            return n
+            return int(n)
         else:
             n = float(n[:-1]) * num_map.get(n[-1].upper(), 1)
         return int(n)
 
-    def __scroll_elements_vertically(self, e: uiautomator2.UiObject):
+    def __scrool_elements_horizontally(self, e: list):
         """take the last element informed in e and scroll to the first element
-        :param e (u2.UiObject): Element informed
 
         Args:
-            e (uiautomator2.UiObject):
+            e (list): nodes of the same snapshot, as returned by ScreenSnapshot.find
         """
-        if e.exists and e.count > 1:
-            i = e.count
-            fx = e[i - 1].info['visibleBounds']['right'] / 2
-            fy = e[i - 1].info['visibleBounds']['top']
-            # tx = e[0].info['visibleBounds']['left']
-            tx = fx
-            ty = e[0].info['visibleBounds']['bottom']
-            if fy == ty:
-                e.swipe("up")
-            else:
-                self.d.swipe(fx, fy, tx, ty, duration=0)
-
-    def __scrool_elements_horizontally(self, e: uiautomator2.UiObject):
-        """take the last element informed in e and scroll to the first element
-        :param e (u2.UiObject): Element informed
-
-        Args:
-            e (uiautomator2.UiObject):
-        """
-        if e.count > 2:
-            fx = e[-1].info['visibleBounds']['left']
-            fy = e[-1].info['visibleBounds']['top']
-            tx = e[0].info['visibleBounds']['left']
-            ty = e[0].info['visibleBounds']['bottom']
+        if len(e) > 2:
+            fx = e[-1].bounds.left
+            fy = e[-1].bounds.top
+            tx = e[0].bounds.left
+            ty = e[0].bounds.bottom
             self.d.swipe(fx, fy, tx, ty, duration=0)
 
-    def __get_type_media(self) -> int:
-        if self.d(resourceId="com.instagram.android:id/carousel_media_group").exists:
-            return MediaType.CAROUSEL
-        if self.d(resourceId="com.instagram.android:id/row_feed_photo_imageview").info['contentDescription']. \
-                startswith("Video by "):
-            return MediaType.VIDEO
-        return MediaType.PHOTO
-
     def open_home_feed(self) -> bool:
         try:
             print(good("Opening home feed"))
-            self.__reset_app()
-            self.d(resourceId='com.instagram.android:id/tab_icon', instance=0).click()
-            self.d(resourceId='com.instagram.android:id/tab_icon', instance=0).click()
+            self.nav.main_screen()
+            self.sel.tab_icon.extend(instance=0).on(self.d).click()
+            self.sel.tab_icon.extend(instance=0).on(self.d).click()
         except Exception as e:
             self.lg.error(e)
             return False
         else:
             return True
 
-    def get_users_liked_by_you(self, amount):
-        self.d(resourceId="com.instagram.android:id/profile_tab").click()
-        self.d(resourceId="com.instagram.android:id/profile_tab").click()
-        self.d(description="Options").click()
-        self.d(resourceId="com.instagram.android:id/menu_settings_row").click()
-        self.d(resourceId="com.instagram.android:id/row_simple_text_textview", text="Account").click()
-        self.d(resourceId="com.instagram.android:id/row_simple_text_textview", text="Posts You've Liked").click()
-        u = []
-        while not self.d(resourceId="com.instagram.android:id/media_set_row_content_identifier").exists:
-            self.wait()
-        while True:
-            for c in [r.child(className="android.widget.ImageView") for r in
-                      self.d(resourceId="com.instagram.android:id/media_set_row_content_identifier")]:
-                for p in c:
-                    p.click()
-                    if self.d(resourceId="com.instagram.android:id/button", text="Follow").exists:
-                        u.append(self.d(
-                            resourceId="com.instagram.android:id/row_feed_photo_profile_name").get_text().split()[0])
-                    self.d.press("back")
-            self.__scroll_elements_vertically(
-                self.d(resourceId="com.instagram.android:id/media_set_row_content_identifier"))
-            while self.d(resourceId="com.instagram.android:id/row_load_more_button").exists:
-                self.d(resourceId="com.instagram.android:id/row_load_more_button").click()
-                self.wait()
-            u = list(dict.fromkeys(u))
-            if len(u) > amount:
-                break
+    def get_users_liked_by_you(self, amount: int) -> list:
+        """
+        Args:
+            amount (int): number of users to return
 
-        return u[:amount]
+        Returns:
+            list: authors of posts you liked that you don't follow
+        """
+        return list(itertools.islice(self.iter_users_liked_by_you(), amount))
+
+    def iter_users_liked_by_you(self) -> Iterator[str]:
+        """Like get_users_liked_by_you, but yields each author as soon as it
+        is known. Posts in self.authors are not opened again."""
+        self.sel.profile_tab.on(self.d).click()
+        self.sel.profile_tab.on(self.d).click()
+        self.sel.options.on(self.d).click()
+        self.sel.settings.on(self.d).click()
+        self.sel.settings_item.extend(text="Account").on(self.d).click()
+        self.sel.settings_item.extend(text="Posts You've Liked").on(self.d).click()
+        s = self.waiter.element(**self.sel.grid_row, timeout=15, label="liked posts") or self.snapshot()
+        seen = {}
+        resolved = set()
+
+        def thumbnails(p: ScreenSnapshot) -> List[Node]:
+            return [n for r in self.sel.grid_row.find(p) for n in self.sel.thumbnail.children(r)]
+
+        def load_more(p: ScreenSnapshot) -> bool:
+            if not self.sel.load_more.exists(p):
+                return False
+            self.__tap(self.sel.load_more.first(p))
+            self.waiter.stable(label="liked posts more")
+            return True
+
+        for page in self.scroller.pages(lambda p: [thumbnail_key(n) or str(n.bounds) for n in thumbnails(p)],
+                                        self.sel.grid_row, action=load_more, label="liked posts", first=s):
+            for n in thumbnails(page.snapshot):
+                key = thumbnail_key(n)
+                if key is not None and key in resolved:
+                    continue
+                resolved.add(key)
+                p = self.authors.get(key) if key is not None else None
+                if p is None:
+                    p = self.__open_liked_post(n, key)
+                if p is not None and not p.followed and not self.__follows(p.author):
+                    yield from self.__unseen([p.author], seen)
+
+    def __open_liked_post(self, thumbnail: Node, key: Optional[str]) -> Optional[PostAuthor]:
+        """Tap a thumbnail, read the author of the post and go back to the grid
+
+        Args:
+            thumbnail (Node): thumbnail on screen
+            key (str): thumbnail_key of the thumbnail, the result isn't kept if None
+        """
+        self.__tap(thumbnail)
+        post = self.waiter.element(**self.sel.post_author, timeout=5, label="liked post") or self.snapshot()
+        author = self.sel.post_author.get_text(post)
+        followed = not self.sel.button.extend(text="Follow").exists(post)
+        self.d.press("back")
+        if not author:
+            return None
+        author = author.split()[0]
+        if key is None:
+            return PostAuthor(key, author, followed, time.time())
+        return self.authors.put(key, author, followed)
+
+    def __follows(self, username: str) -> bool:
+        """True if a follow since the post was opened is known"""
+        if self.journal is not None and self.journal.done(Action.FOLLOW, username):
+            return True
+        cached = self.profiles.get(username)
+        return cached is not None and bool(cached.followed)
 
     def login(self, username: str, password: str, reset: bool = False):
         """
@@ -204,16 +512,18 @@ class Burbnbot:
             password (str):
             reset (bool):
         """
+        self.ensure_ready(logged_in=False)
         if reset:
             self.d.app_clear("com.instagram.android")
+            self.session.forget(self.metrics.labels["device"])
+            self.ready = False
         self.d.app_start(package_name="com.instagram.android")
         if self.d(text="Log In").exists:
             self.d(text="Log In").click()
-        if self.d(resourceId='com.instagram.android:id/login_username').exists and self.d(
-                resourceId='com.instagram.android:id/password').exists:
-            self.d(resourceId='com.instagram.android:id/login_username').send_keys(username)
-            self.d(resourceId='com.instagram.android:id/password').send_keys(password)
-            self.d(resourceId='com.instagram.android:id/button_text').click()
+        if self.sel.login_username.on(self.d).exists and self.sel.login_password.on(self.d).exists:
+            self.sel.login_username.on(self.d).send_keys(username)
+            self.sel.login_password.on(self.d).send_keys(password)
+            self.sel.login_submit.on(self.d).click()
             self.wait()
 
     def open_media(self, media_code: str) -> bool:
@@ -229,8 +539,8 @@ class Burbnbot:
         try:
             url = "https://www.instagram.com/p/{}/".format(media_code)
             print(good("Opening post {}.".format(url)))
-            self.d.shell("am start -a android.intent.action.VIEW -d {}".format(url))
-            r = self.d.xpath("//*[@resource-id='android:id/list']//*[@class='android.widget.FrameLayout'][2]").exists
+            self.nav.open_url(url)
+            r = self.d.xpath(self.sel.post_list).exists
         except Exception as e:
             self.lg.error(e)
             return False
@@ -248,23 +558,51 @@ class Burbnbot:
             bool: The return value. True for success, False otherwise.
         """
         try:
-            self.__reset_app()
             url = "https://www.instagram.com/explore/locations/{}/".format(locationcode)
             print(good("Opening location {}.".format(url)))
-            self.d.shell("am start -a android.intent.action.VIEW -d {}".format(url))
-            self.wait(5)
+            self.nav.open_url(url)
             if tab is not None:
-                while not self.d(text="{}".format(tab)).exists:
-                    self.wait(1)
+                self.waiter.element(text="{}".format(tab), timeout=15, label="location")
                 self.d(text="{}".format(tab)).click()
-            self.wait(5)
-            self.d(resourceId='com.instagram.android:id/image_button').click()
+                self.waiter.stable(label="location tab")
+            else:
+                self.waiter.element(**self.sel.grid_image, label="location")
+            self.sel.grid_image.on(self.d).click()
         except Exception as e:
             self.lg.error(e)
             return False
         else:
             return True
 
+    def __read_profile(self, s: ScreenSnapshot, username: str) -> Profile:
+        """Header of the profile on screen
+
+        Args:
+            s (ScreenSnapshot): screen showing the profile
+            username (str): profile username
+        """
+        counts = []
+        for sel in (self.sel.posts_count, self.sel.followers_count, self.sel.following_count):
+            n = sel.get_text(s)
+            try:
+                counts.append(None if n is None else self.__str_to_number(n))
+            except ValueError:
+                counts.append(None)
+        button = self.sel.profile_follow_button.get_text(s)
+        has_posts = counts[0] > 0 if counts[0] is not None else self.sel.grid_row.exists(s)
+        return Profile(username, *counts, followed=None if button is None else button in ("Following", "Requested"),
+                       has_posts=has_posts, time=time.time())
+
+    def profile(self, username: str) -> Optional[Profile]:
+        """Profile header read the last time it was opened, None if it
+        wasn't opened recently. No device call, use it to skip profiles
+        before navigating to them.
+
+        Args:
+            username (str):
+        """
+        return self.profiles.get(username)
+
     def open_profile(self, username: str, open_post: bool = False) -> bool:
         """Open a profile
 
@@ -276,24 +614,74 @@ class Burbnbot:
             bool: The return value. True for success, False otherwise.
         """
         try:
-            self.__reset_app()
+            cached = self.profiles.get(username)
+            if open_post and cached is not None and not cached.has_posts:
+                print(bad("Looks like this profile have zero posts."))
+                return False
             url = "https://www.instagram.com/{}/".format(username)
             print(good("Opening profile {}.".format(url)))
-            self.d.shell("am start -a android.intent.action.VIEW -d {}".format(url))
-            self.wait()
-            if self.d(resourceId="com.instagram.android:id/action_bar_textview_title").get_text() == username:
-                if open_post:
-                    self.wait(3)
-                    if self.d(resourceId="com.instagram.android:id/media_set_row_content_identifier", instance=0).child(className="android.widget.ImageView", instance=0).exists:
-                        self.d(resourceId="com.instagram.android:id/media_set_row_content_identifier", instance=0).child(className="android.widget.ImageView", instance=0).click()
-                    else:
-                        print(bad("Looks like this profile have zero posts."))
-                        return False
-                return True
+            self.nav.open_url(url)
+            s = self.waiter.until(lambda p: title(p, self.sel) == username, label="profile") or self.snapshot()
+            if not title(s, self.sel) == username:
+                # the warm app didn't follow the link, retry from a clean start
+                print(bad("Expected the profile {}, found: {}".format(username, self.screen(s))))
+                self.nav.restart()
+                self.nav.open_url(url)
+                s = self.waiter.until(lambda p: title(p, self.sel) == username, label="profile") or self.snapshot()
+            if title(s, self.sel) == username:
+                self.profiles.put(self.__read_profile(s, username))
+                return self.__open_first_post() if open_post else True
         except Exception as e:
             self.lg.error(e)
             return False
 
+    def __open_first_post(self) -> bool:
+        """Open the first post of the profile on screen, False if it has none"""
+        s = self.waiter.element(**self.sel.grid_row, timeout=5, label="profile grid") or self.snapshot()
+        row = self.sel.grid_row.first(s)
+        thumbs = [] if row is None else self.sel.thumbnail.children(row)
+        if not thumbs:
+            print(bad("Looks like this profile have zero posts."))
+            return False
+        self.__tap(thumbs[0])
+        return True
+
+    def visit_profile(self, username: str, likes: int = 0, follow: bool = False,
+                      save: Union[bool, str] = False) -> bool:
+        """Follow a user, save their last post and like their posts opening
+        the profile once: the follow is done on the profile, the save and the
+        likes on its first post
+
+        Args:
+            username (str):
+            likes (int): posts to like
+            follow (bool): follow the user
+            save (bool or str): collection to save the last post in, True for
+                today's collection, like save_user
+
+        Returns:
+            bool: True if everything asked was done
+        """
+        followed = self.__follow_done(username) if follow else None
+        colletion = str(datetime.date.today()) if save is True else save
+        saved = self.__save_done(username, colletion) if save else None
+        if not likes and (not follow or followed is not None) and (not save or saved is not None):
+            # nothing left to do on the device
+            return bool((followed if follow else True) and (saved if save else True))
+        opened = self.open_profile(username)
+        ok = True
+        if follow:
+            ok = followed if followed is not None else self.__follow_here(username, opened)
+        if (saved is None and save) or likes > 0:
+            post = opened and self.__open_first_post()
+            if saved is None and save:
+                saved = self.__record(Action.SAVE, "{}/{}".format(colletion, username),
+                                      post and self.__save_post(colletion))
+            if post and likes > 0:
+                self.like_n_swipe(likes)
+            ok = ok and post
+        return bool(ok and (saved if save else True))
+
     def open_tag(self, tag: str, tab: str = "Recent") -> bool:
         """Search a hashtag
 
@@ -306,17 +694,25 @@ class Burbnbot:
         """
         try:
             print(good("Opening hashtag: "), green(tag))
-            self.__reset_app()
-            while not self.d(text="{}".format(tab)).exists:
-                url = "https://www.instagram.com/explore/tags/{}/".format(tag)
-                self.d.shell("am start -a android.intent.action.VIEW -d {}".format(url))
-                self.wait(5)
-
-            self.d(text="{}".format(tab)).click()
-            self.wait()
-
-            if self.d.xpath("//*[@resource-id='com.instagram.android:id/hashtag_media_count']").exists:
-                self.d(resourceId='com.instagram.android:id/image_button').click()
+            url = "https://www.instagram.com/explore/tags/{}/".format(tag)
+            s = None
+            for attempt in range(3):
+                if attempt == 1:
+                    # the warm app didn't follow the link, retry from a clean start
+                    self.nav.restart()
+                self.nav.open_url(url)
+                s = self.waiter.element(text="{}".format(tab), label="hashtag")
+                if s is not None:
+                    break
+            if s is None:
+                print(bad("Couldn't open the hashtag {}.".format(tag)))
+                return False
+
+            self.__tap(s.first(text="{}".format(tab)))
+            s = self.waiter.stable(label="hashtag tab") or self.snapshot()
+
+            if self.sel.hashtag_media_count.exists(s):
+                self.sel.grid_image.on(self.d).click()
 
         except Exception as e:
             self.lg.error(e)
@@ -324,36 +720,30 @@ class Burbnbot:
         else:
             return True
 
-    def get_least_interacted(self):
-        lu = []
-        i = 0
-        last_username = ""
-        self.__reset_app()
+    def get_least_interacted(self) -> list:
+        """accounts you've interacted with the least in the last 90 days"""
+        return list(self.iter_least_interacted())
+
+    def iter_least_interacted(self) -> Iterator[str]:
+        """Like get_least_interacted, but yields each username as soon as it is read"""
+        seen = {}
+        self.nav.main_screen()
         try:
             print(good("Opening profiles less interacted."))
-            while not self.d(resourceId="com.instagram.android:id/action_bar_textview_title",
-                             text="Least Interacted With").exists:
-                self.d(resourceId="com.instagram.android:id/profile_tab").click(timeout=10)
-                self.d(resourceId="com.instagram.android:id/profile_tab").click(timeout=5)
-                self.d(resourceId="com.instagram.android:id/row_profile_header_following_container").click(timeout=10)
-                self.d(resourceId="com.instagram.android:id/title", text="Least Interacted With").click()
-            self.wait(5)
-            while i < 3:
-                if self.d(resourceId="com.instagram.android:id/follow_list_username").exists:
-                    for e in self.d(resourceId="com.instagram.android:id/follow_list_username"):
-                        lu.append(e.get_text())
-                    self.__scroll_elements_vertically(self.d(resourceId="com.instagram.android:id/follow_list_container", className="android.widget.LinearLayout"))
-
-                if last_username == lu[-1]:
-                    i += 1
-                else:
-                    last_username = lu[-1]
+            while not self.sel.title.extend(text="Least Interacted With").on(self.d).exists:
+                self.sel.profile_tab.on(self.d).click(timeout=10)
+                self.sel.profile_tab.on(self.d).click(timeout=5)
+                self.sel.following_container.on(self.d).click(timeout=10)
+                self.sel.menu_title.extend(text="Least Interacted With").on(self.d).click()
+            self.waiter.element(**self.sel.list_username, label="least interacted")
+            for page in self.scroller.pages(
+                    self.sel.list_username.texts,
+                    self.sel.list_row.extend(className="android.widget.LinearLayout"), label="least interacted"):
+                yield from self.__unseen(page.new, seen)
 
         except Exception as e:
             self.lg.error(e)
 
-        return list(dict.fromkeys(lu))
-
     def __double_click(self, e: uiautomator2.UiObject):
         """Double click center the element :param e: Element
 
@@ -363,142 +753,215 @@ class Burbnbot:
         x, y = e.center()
         self.d.double_click(x, y, duration=0.1)
 
-    def get_following_list(self) -> list:
-        list_following = []
+    def get_following_list(self, incremental: bool = False) -> list:
+        """
+        Args:
+            incremental (bool): needs a store with a complete previous scrape.
+                The list is sorted by date followed (latest first), so the
+                scrape stops at the first page of users already known.
+
+        Returns:
+            list: usernames you follow
+        """
+        list_following = list(self.iter_following(incremental=incremental))
+        if self.store is not None and not self.store.in_progress(FOLLOWING):
+            return self.store.usernames(FOLLOWING)
+        return list_following
+
+    def iter_following(self, incremental: bool = False) -> Iterator[str]:
+        """Like get_following_list, but yields each username as soon as it
+        appears on screen, so the caller can work on it while the list scrolls.
+        With incremental=True only the new users are yielded.
+
+        Args:
+            incremental (bool): see get_following_list
+        """
+        seen = {}
+        scrape = None
+        known = set()
+        if self.store is not None:
+            scrape = self.store.begin(FOLLOWING)
+            seen = scrape.seen
+            if scrape.resumed:
+                print(good("Resuming following list, {} already read".format(len(seen))))
+                if not incremental:
+                    yield from list(seen)
+            if incremental and self.store.last_sync(FOLLOWING) is not None:
+                known = set(self.store.usernames(FOLLOWING))
         try:
-            self.__reset_app()
-            self.d(resourceId="com.instagram.android:id/profile_tab").click(timeout=10)
-            self.d(resourceId="com.instagram.android:id/profile_tab").click(timeout=5)
+            self.nav.main_screen()
+            self.sel.profile_tab.on(self.d).click(timeout=10)
+            self.sel.profile_tab.on(self.d).click(timeout=5)
             print(good("Opening following list"))
-            following_count = self.__str_to_number(
-                self.d(resourceId="com.instagram.android:id/row_profile_header_textview_following_count").get_text())
+            count = self.sel.following_count.on(self.d).get_text()
+            following_count = self.__str_to_number(count)
             print(good("{} followings".format(following_count)))
-            self.d(resourceId="com.instagram.android:id/row_profile_header_following_container").click(timeout=10)
-            self.wait()
-            while not self.d(resourceId="com.instagram.android:id/follow_list_sorting_option_radio_button").exists:
-                self.d(resourceId="com.instagram.android:id/sorting_entry_row_icon").click()
-                self.wait()
-            self.d(resourceId="com.instagram.android:id/follow_list_sorting_option_radio_button")[2].click(timeout=10)
-            self.wait()
-            if self.d(resourceId="com.instagram.android:id/follow_list_username").exists:
-                rscid = "com.instagram.android:id/sorting_entry_row_option"
-                fx = self.d(resourceId=rscid).info['visibleBounds']['right'] / 2
-                fy = self.d(resourceId=rscid).info['visibleBounds']['top']
+            self.sel.following_container.on(self.d).click(timeout=10)
+            s = self.waiter.element(**self.sel.sort_entry,
+                                    label="following list") or self.snapshot()
+            while not self.sel.sort_option.exists(s):
+                self.sel.sort_entry.on(self.d).click()
+                s = self.waiter.element(**self.sel.sort_option,
+                                        timeout=5, label="sort options") or self.snapshot()
+            latest = s.first(text="Date followed: Latest")
+            if latest is not None:
+                self.__tap(latest)
+            else:
+                self.sel.sort_option.on(self.d)[2].click(timeout=10)
+            s = self.waiter.stable(label="following sorted") or self.snapshot()
+            if self.sel.list_username.exists(s):
+                option = self.sel.sort_label.bounds(s)
+                fx = option.right / 2
+                fy = option.top
                 tx = fx
-                ty = self.d(resourceId="com.instagram.android:id/row_search_edit_text").info['visibleBounds']['bottom']
+                ty = self.sel.search.bounds(s).bottom
                 self.d.swipe(fx, fy, tx, ty, duration=0)
-                while True:
-
-                    try:
-                        if self.d(resourceId="com.instagram.android:id/follow_list_username").exists:
-                            if self.d(resourceId="com.instagram.android:id/follow_list_username").count > 0:
-                                for elem in self.d(resourceId="com.instagram.android:id/follow_list_username"):
-                                    list_following.append(elem.get_text())
-                    except uiautomator2.exceptions.UiObjectNotFoundError:
-                        pass
-                    self.__scroll_elements_vertically(
-                        self.d(resourceId="com.instagram.android:id/follow_list_container"))
-
-                    if self.d(text="Suggestions for you").exists:
-                        list_following = list_following + [elem.get_text() for elem in self.d(
-                            resourceId="com.instagram.android:id/follow_list_username") if elem.exists]
-                        break
-
-                    print(run("Following: #{}".format(len(list(dict.fromkeys(list_following))))), end="\r", flush=True)
+                page = None
+                for page in self.scroller.pages(
+                        self.sel.list_username.texts,
+                        self.sel.list_row,
+                        end=lambda p: p.exists(text="Suggestions for you"), label="following"):
+                    new = scrape.add(page.new) if scrape is not None else self.__unseen(page.new, seen)
+                    yield from (u for u in new if u not in known)
+
+                    if known and page.rows and all(u in known for u in page.rows):
+                        print(good("Reached users already known"), "\r")
+                        self.__save_usernames(FOLLOWING, self.store.finish(scrape, full=False))
+                        return
+
+                    print(run("Following: #{}".format(len(seen))), end="\r", flush=True)
+                if not self.__complete(page, count, len(seen)):
+                    # a partial list would mark everyone not read yet as unfollowed, resume it next time
+                    print(bad("The following list stopped scrolling, {} read".format(len(seen))))
+                    self.lg.warning("Following list stalled after {} users, kept in progress".format(len(seen)))
+                    return
                 print(good("Done"), "\r")
+                self.__save_usernames(FOLLOWING, self.store.finish(scrape) if scrape is not None else seen)
         except Exception as e:
             self.__treat_exception(e)
-        return list(dict.fromkeys(list_following))
 
     def get_followers_list(self) -> list:
-        list_followers = []
+        """
+        Returns:
+            list: usernames following you
+        """
+        list_followers = list(self.iter_followers())
+        if self.store is not None and not self.store.in_progress(FOLLOWERS):
+            return self.store.usernames(FOLLOWERS)
+        return list_followers
+
+    def iter_followers(self) -> Iterator[str]:
+        """Like get_followers_list, but yields each username as soon as it
+        appears on screen"""
+        seen = {}
+        scrape = None
+        if self.store is not None:
+            scrape = self.store.begin(FOLLOWERS)
+            seen = scrape.seen
+            if scrape.resumed:
+                print(good("Resuming followers list, {} already read".format(len(seen))))
+                yield from list(seen)
         try:
             finisher_str = "Suggestions for you"
-            self.__reset_app()
-            self.d(resourceId="com.instagram.android:id/profile_tab").click(timeout=10)
-            self.d(resourceId="com.instagram.android:id/profile_tab").click(timeout=5)
+
+            def retry(p: ScreenSnapshot) -> bool:
+                button = p.first(description="Retry")
+                if button is not None:
+                    self.wait(10)
+                    self.__tap(button)
+                return button is not None
+
+            self.nav.main_screen()
+            self.sel.profile_tab.on(self.d).click(timeout=10)
+            self.sel.profile_tab.on(self.d).click(timeout=5)
             print(good("Opening followers list"))
-            followers_count = self.__str_to_number(
-                self.d(resourceId="com.instagram.android:id/row_profile_header_textview_followers_count").get_text())
+            count = self.sel.followers_count.on(self.d).get_text()
+            followers_count = self.__str_to_number(count)
             print(good("{} followers".format(followers_count)))
-            self.d(resourceId="com.instagram.android:id/row_profile_header_followers_container").click(timeout=10)
-            self.wait()
-            if self.d(resourceId="com.instagram.android:id/follow_list_username").exists:
-                while True:
-                    try:
-                        if self.d(resourceId="com.instagram.android:id/follow_list_username").exists:
-                            if self.d(resourceId="com.instagram.android:id/follow_list_username").count > 0:
-                                for elem in self.d(resourceId="com.instagram.android:id/follow_list_username"):
-                                    list_followers.append(elem.get_text())
-                    except uiautomator2.exceptions.UiObjectNotFoundError:
-                        pass
-
-                    self.__scroll_elements_vertically(
-                        self.d(resourceId="com.instagram.android:id/follow_list_container"))
-
-                    if self.d(description="Retry").exists:
-                        self.wait(10)
-                        self.d(description="Retry").click()
-
-                    if self.d(resourceId="com.instagram.android:id/row_header_textview").exists:
-                        if self.d(resourceId="com.instagram.android:id/row_header_textview").get_text() == finisher_str:
-                            break
-
-                    print(run("Followers #: {}".format(len(list(dict.fromkeys(list_followers))))), end="\r", flush=True)
+            self.sel.followers_container.on(self.d).click(timeout=10)
+            if self.waiter.element(**self.sel.list_username, label="followers list"):
+                page = None
+                for page in self.scroller.pages(
+                        self.sel.list_username.texts,
+                        self.sel.list_row,
+                        end=lambda p: self.sel.list_header.get_text(p) == finisher_str,
+                        action=retry, label="followers"):
+                    yield from scrape.add(page.new) if scrape is not None else self.__unseen(page.new, seen)
+                    print(run("Followers #: {}".format(len(seen))), end="\r", flush=True)
+                if not self.__complete(page, count, len(seen)):
+                    print(bad("The followers list stopped scrolling, {} read".format(len(seen))))
+                    self.lg.warning("Followers list stalled after {} users, kept in progress".format(len(seen)))
+                    return
                 print(good("Done"), "\r")
+                self.__save_usernames(FOLLOWERS, self.store.finish(scrape) if scrape is not None else seen)
         except Exception as e:
             self.__treat_exception(e)
 
-        return list(dict.fromkeys(list_followers))
+    def __click_n_wait(self, elem: Node):
+        self.__tap(elem)
+        self.__sleep(random.randint(3, 5), "like")
 
-    @staticmethod
-    def __click_n_wait(elem: uiautomator2.UiObject):
-        if elem.exists:
-            elem.click()
-            sleep(random.randint(3, 5))
+    def iter_feed(self) -> Iterator[Post]:
+        """Posts of the feed on screen (home, hashtag, location or profile),
+        each one once, as soon as its like button is visible. Act on a post
+        before taking the next one, the feed is swiped in between.
+        """
+        walker = FeedWalker(self.d, self.scroller, sel=self.sel)
+        yield from walker.walk(recover=lambda s: self.__not_found_like("row_feed_button_like", s))
 
-    def like_n_swipe(self, amount: int = 1):
+    def like_n_swipe(self, amount: int = 1, policy: Callable[[Post], bool] = None):
         """
         Args:
             amount (int): number of posts to like
+            policy (callable): receives each Post not liked yet and returns
+                True to like it, by default every post that isn't sponsored
+
+        Returns:
+            int: number of posts liked, None on error
         """
         lk = 0
+        if policy is None:
+            policy = lambda p: not p.sponsored
         try:
-            while lk < amount:
-                if self.d(resourceId="com.instagram.android:id/secondary_label").exists and \
-                        self.d(resourceId="com.instagram.android:id/secondary_label").get_text() == "Sponsored":
-                    lk = lk - 1
-                try:
-                    if self.d(resourceId="com.instagram.android:id/row_feed_button_like", description="Like").exists:
-                        lk = lk + len([self.__click_n_wait(e) for e in self.d(resourceId="com.instagram.android:id/row_feed_button_like", description="Like")])
-                        print(run("Liking: {}/{}".format(lk, amount)), end="\r", flush=True)
-                    else:
-                        self.d(resourceId="com.instagram.android:id/refreshable_container").swipe(direction="up")
-                except uiautomator2.exceptions.UiObjectNotFoundError as e:
-                    self.__not_found_like(e)
-                    pass
+            if amount > 0:
+                for post in self.iter_feed():
+                    if post.liked or not policy(post):
+                        continue
+                    if self.__done(Action.LIKE, post.key):
+                        continue
+                    self.__click_n_wait(post.like)
+                    self.__record(Action.LIKE, post.key, True)
+                    lk += 1
+                    print(run("Liking: {}/{}".format(lk, amount)), end="\r", flush=True)
+                    if lk >= amount:
+                        break
         except Exception as e:
             self.__treat_exception(e)
             return None
 
         sys.stdout.write("\033[K")  # Clear to the end of line
         print(good("Liked: {}/{}".format(lk, amount)))
+        return lk
 
-    def __not_found_like(self, e: uiautomator2.UiObjectNotFoundError):
-        if self.d(resourceId="com.instagram.android:id/default_dialog_title").exists:
-            if self.d(resourceId="com.instagram.android:id/default_dialog_title").get_text() == "Try Again Later":
-                print(bad("ERROR: TOO MANY REQUESTS, TAKE A BREAK HAMILTON."))
-                self.d.app_clear(package_name="com.instagram.android")
-                quit(1)
-        msg = "Element not found: {} You probably don't have to worry about.".format(e.data)
+    def __not_found_like(self, element, s: ScreenSnapshot = None):
+        """
+        Args:
+            element: description of the element not found
+            s (ScreenSnapshot): current screen, dumped again if None
+        """
+        if s is None:
+            s = self.snapshot()
+        screen = self.screen(s)
+        if screen == ScreenType.RATE_LIMITED:
+            print(bad("ERROR: TOO MANY REQUESTS, TAKE A BREAK HAMILTON."))
+            self.d.app_clear(package_name="com.instagram.android")
+            quit(1)
+        msg = "Element not found: {} You probably don't have to worry about.".format(element)
         print(bad(msg))
-        self.lg.error(e)
+        self.lg.error(msg)
 
         # sometimes a wrong click open a different screen
-        if (self.d(resourceId="com.instagram.android:id/profile_header_avatar_container_top_left_stub").exists or
-            self.d(resourceId="com.instagram.android:id/pre_capture_buttons_top_container").exists) or \
-                (not self.d(resourceId="com.instagram.android:id/refreshable_container").exists and
-                 self.d(resourceId="com.instagram.android:id/action_bar_new_title_container").exists):
+        if screen in WRONG_PLACE:
             msg = "It looks like we're in the wrong place, let's try to get back."
             print(bad(msg))
             self.lg.error(msg)
@@ -509,30 +972,140 @@ class Burbnbot:
         Args:
             username (str):
         """
+        done = self.__done(Action.UNFOLLOW, username)
+        if done is not None:
+            return done
         print(good("Unfollowing user: {}".format(username)))
-        self.d(resourceId="com.instagram.android:id/profile_tab").click(timeout=10)
-        self.d(resourceId="com.instagram.android:id/profile_tab").click(timeout=5)
-        self.d(resourceId="com.instagram.android:id/row_profile_header_following_container").click(timeout=10)
-        self.wait()
-        self.d(resourceId="com.instagram.android:id/row_search_edit_text").send_keys(username)
-        self.wait()
-        if self.d(resourceId="com.instagram.android:id/button").count == 1:
-            if self.d(resourceId="com.instagram.android:id/button").get_text() == 'Following':
-                self.d(resourceId="com.instagram.android:id/button").click(timeout=5)
+        self.__open_following_search()
+        self.sel.search.on(self.d).send_keys(username)
+        return self.__record(Action.UNFOLLOW, username, self.__unfollow_search_result(username))
+
+    def bulk_unfollow(self, usernames: Iterable[str], keep: Iterable[str] = None) -> Dict[str, bool]:
+        """Unfollow several users opening the following list only once, the
+        search field is cleared and reused for each user
+
+        Args:
+            usernames (iterable): users to unfollow
+            keep (iterable): users that must not be unfollowed, e.g. your
+                followers
+
+        Returns:
+            dict: username -> True if it was unfollowed
+        """
+        keep = set(keep or ())
+        report = {}
+        targets = []
+        for u in dict.fromkeys(usernames):
+            if u in keep:
+                continue
+            done = self.__done(Action.UNFOLLOW, u)
+            if done is None:
+                targets.append(u)
+            else:
+                report[u] = done
+        if not targets:
+            return report
+        print(good("Unfollowing {} users".format(len(targets))))
+        self.__open_following_search()
+        search = self.sel.search.on(self.d)
+        unfollowed = 0
+        for username in targets:
+            try:
+                search.clear_text()
+                search.send_keys(username)
+                report[username] = self.__record(Action.UNFOLLOW, username,
+                                                 self.__unfollow_search_result(username))
+            except Exception as e:
+                self.__treat_exception(e)
+                report[username] = self.__record(Action.UNFOLLOW, username, False)
+            unfollowed += bool(report[username])
+            print(run("Unfollowed: {}/{}".format(unfollowed, len(targets))), end="\r", flush=True)
+        sys.stdout.write("\033[K")  # Clear to the end of line
+        print(good("Unfollowed: {}/{}".format(unfollowed, len(targets))))
+        return report
+
+    @staticmethod
+    def non_followers(following: Iterable[str], followers: Iterable[str]) -> list:
+        """Users you follow that don't follow you back, in the order of following
+
+        Args:
+            following (iterable): usernames you follow
+            followers (iterable): usernames following you
+        """
+        followers = set(followers)
+        return [u for u in dict.fromkeys(following) if u not in followers]
+
+    def __open_following_search(self):
+        self.sel.profile_tab.on(self.d).click(timeout=10)
+        self.sel.profile_tab.on(self.d).click(timeout=5)
+        self.sel.following_container.on(self.d).click(timeout=10)
+        self.waiter.element(**self.sel.search, label="following list")
+
+    def __unfollow_search_result(self, username: str) -> bool:
+        """Unfollow the only user listed in the search result of the following list
+
+        Args:
+            username (str): user searched
+        """
+        if self.__unfollow_search_button(username):
+            self.profiles.update(username, followed=False)
+            return True
+        return False
+
+    def __unfollow_search_button(self, username: str) -> bool:
+        """Tap the Following button of the search result, True if it turned into Follow
+
+        Args:
+            username (str): user searched
+        """
+        result = self.sel.list_username.extend(text=username)
+        s = self.waiter.until(lambda r: self.sel.button.count(r) == 1 and result.exists(r), timeout=5, label="search")
+        buttons = self.sel.button.find(s or self.snapshot())
+        if len(buttons) == 1:
+            if buttons[0].text == 'Following':
+                self.__tap(buttons[0])
         else:
             return False
-        return self.d(resourceId="com.instagram.android:id/button").get_text() == 'Follow'
+        return self.sel.button.get_text(self.snapshot()) == 'Follow'
 
     def follow(self, username: str):
         """
         Args:
             username (str):
         """
-        if self.open_profile(username):
+        done = self.__follow_done(username)
+        if done is not None:
+            return done
+        return self.__follow_here(username, self.open_profile(username))
+
+    def __follow_done(self, username: str) -> Optional[bool]:
+        """Result of a follow already known, from the journal or the profile
+        cache, None if it has to be done"""
+        done = self.__done(Action.FOLLOW, username)
+        if done is not None:
+            return done
+        cached = self.profiles.get(username)
+        if cached is not None and cached.followed:
+            self.__started.pop((Action.FOLLOW, username), None)
+            self.__event(Action.FOLLOW, username, "skipped")
+            return True
+        return None
+
+    def __follow_here(self, username: str, opened: bool) -> bool:
+        """Follow the user whose profile is on screen
+
+        Args:
+            username (str):
+            opened (bool): False if the profile couldn't be opened
+        """
+        if opened:
             while self.d(text="Follow").exists:
                 self.d(text="Follow").click()
             print(good("Following user: {}".format(username)))
-        return self.d(text="Following").exists
+        followed = self.d(text="Following").exists
+        if followed:
+            self.profiles.update(username, followed=True)
+        return self.__record(Action.FOLLOW, username, followed)
 
     def save_user(self, username: str, colletion: str = None):
         """
@@ -542,104 +1115,220 @@ class Burbnbot:
         """
         if colletion is None:
             colletion = str(datetime.date.today())
+        done = self.__save_done(username, colletion)
+        if done is not None:
+            return done
+        return self.__record(Action.SAVE, "{}/{}".format(colletion, username),
+                             self.__save_to_collection(username, colletion))
+
+    def __save_done(self, username: str, colletion: str) -> Optional[bool]:
+        """Result of a save already known, from the journal or the profile
+        cache, None if it has to be done"""
+        target = "{}/{}".format(colletion, username)
+        done = self.__done(Action.SAVE, target)
+        if done is not None:
+            return done
+        cached = self.profiles.get(username)
+        if cached is not None and not cached.has_posts:
+            self.__started.pop((Action.SAVE, target), None)
+            self.__event(Action.SAVE, target, "skipped")
+            return False
+        return None
+
+    def __save_to_collection(self, username: str, colletion: str) -> bool:
+        """Save the last post of a user in a collection, created if needed
+
+        Args:
+            username (str):
+            colletion (str):
+        """
         if self.open_profile(username):
-            if self.d(resourceId="com.instagram.android:id/profile_viewpager").child(
-                    className="android.widget.ImageView").exists:
-                self.d(resourceId="com.instagram.android:id/profile_viewpager").child(
-                    className="android.widget.ImageView").click()
-                self.wait()
-                self.d(resourceId="com.instagram.android:id/row_feed_button_save").long_click(duration=3)
-                if self.d(resourceId="com.instagram.android:id/collection_name").exists:
-                    collections_name = [e.get_text() for e in
-                                        self.d(resourceId="com.instagram.android:id/collection_name")]
-                    lst = ""
-                    while not lst == collections_name[-1]:
-                        if self.d(text=colletion).exists:
-                            self.d(text=colletion).click()
-                            return True
-                        collections_name = collections_name + [e.get_text() for e in self.d(
-                            resourceId="com.instagram.android:id/collection_name")]
-                        self.__scrool_elements_horizontally(
-                            self.d(resourceId="com.instagram.android:id/selectable_image"))
-                        lst = self.d(resourceId="com.instagram.android:id/collection_name")[-1].get_text()
-
-                    self.d(resourceId='com.instagram.android:id/save_to_collection_new_collection_button').click()
-                    self.wait()
-                    self.d(resourceId='com.instagram.android:id/create_collection_edit_text').send_keys(colletion)
-                    self.d(resourceId='com.instagram.android:id/save_to_collection_action_button').click()
-                    return True
+            s = self.snapshot()
+            pager = self.sel.profile_pager.first(s)
+            thumbs = [] if pager is None else self.sel.thumbnail.children(pager)
+            if thumbs:
+                self.__tap(thumbs[0])
+                return self.__save_post(colletion)
+        return False
+
+    def __save_post(self, colletion: str) -> bool:
+        """Save the post on screen in a collection, created if needed
+
+        Args:
+            colletion (str):
+        """
+        self.waiter.element(**self.sel.save_button, label="post")
+        s = self.__open_collections()
+        if self.sel.collection_name.exists(s):
+            target = self.__find_collection(s, colletion)
+            if target is not None:
+                self.__tap(target)
+                return True
+
+            self.sel.new_collection.on(self.d).click()
+            self.waiter.element(**self.sel.collection_name_edit,
+                                label="new collection")
+            self.sel.collection_name_edit.on(self.d).send_keys(colletion)
+            self.sel.collection_save.on(self.d).click()
+            self.collections.created(colletion)
+            return True
         return False
 
-    def get_notification_users(self) -> list:
-        """return the last users who interacted with you"""
-        list_users = []
+    def __open_collections(self) -> ScreenSnapshot:
+        """Long press save on the post on screen, returns the collection picker"""
+        self.sel.save_button.on(self.d).long_click(duration=3)
+        return self.snapshot()
+
+    def __find_collection(self, s: ScreenSnapshot, colletion: str) -> Optional[Node]:
+        """Show a collection in the picker, jumping to it if its position is
+        known, returns its name node or None if it doesn't exist
+
+        Args:
+            s (ScreenSnapshot): the picker, at its start
+            colletion (str): collection name
+        """
+        name = self.sel.collection_name.extend(text=colletion)
+        known = self.collections.position(colletion)
+        if known is not None:
+            images = self.sel.collection_image.find(s)
+            for _ in range(known):
+                # the images stay where they are, the swipe is the same every time
+                self.__scrool_elements_horizontally(images)
+            if known:
+                s = self.snapshot()
+            target = name.first(s)
+            if target is not None:
+                return target
+            # the picker changed since it was read, read it again from its start
+            self.collections.forget()
+            self.d.press("back")
+            s = self.__open_collections()
+        elif self.collections.absent(colletion):
+            return None
+
+        swipes = 0
+        last = None
+        read = set()
+        while True:
+            names = self.sel.collection_name.texts(s)
+            for n in names:
+                if n not in read:  # pages overlap, keep the first page showing it
+                    read.add(n)
+                    self.collections.seen(n, swipes)
+            target = name.first(s)
+            if target is not None:
+                return target
+            if not names or names[-1] == last:
+                break
+            last = names[-1]
+            self.__scrool_elements_horizontally(self.sel.collection_image.find(s))
+            swipes += 1
+            s = self.snapshot()
+        self.collections.scanned()
+        return None
+
+    def get_notification_users(self, new_only: bool = False) -> list:
+        """return the last users who interacted with you
+
+        Args:
+            new_only (bool): only the users of the notifications newer than
+                the ones read by the last new_only call, see self.activity
+        """
+        return list(self.iter_notification_users(new_only=new_only))
+
+    def iter_notification_users(self, new_only: bool = False) -> Iterator[str]:
+        """Like get_notification_users, but yields each user as soon as it is read.
+        With new_only the watermark moves once the new notifications were all
+        read, a caller stopping early gets them again next time."""
+        seen = {}
+        mark = self.activity if new_only else None
+        newest = None
+        previous = []
+        read = []
+        held = []  # rows that may be the start of the watermark, yielded once they are not
+        keep = max(len(mark.rows) - 1, 0) if mark is not None else 0
         try:
-            self.d(resourceId="com.instagram.android:id/notification").click()
-            self.d(resourceId="com.instagram.android:id/notification").click()
-            while not self.d(text="Suggestions for you").exists:
-                try:
-                    list_users = list_users + [e.get_text().split()[0] for e in
-                                               self.d(resourceId="com.instagram.android:id/row_text")]
-                    self.__scrool_elements_horizontally(self.d(resourceId="com.instagram.android:id/row_text"))
-                except Exception as e:
-                    print(bad("Error: {}.".format(e)))
-                    self.__treat_exception(e)
-                    pass
+            self.sel.notification_tab.on(self.d).click()
+            self.sel.notification_tab.on(self.d).click()
+            for page in self.scroller.pages(
+                    lambda p: [signature(t) for t in self.sel.notification_row.texts(p) if t.strip()],
+                    self.sel.notification_row,
+                    end=lambda p: p.exists(text="Suggestions for you"), label="notifications"):
+                if newest is None:
+                    newest = page.rows
+                users = []
+                reached = False
+                for row in following(previous, page.rows):
+                    read.append(row)
+                    held.append(row)
+                    if mark is not None and mark.reached(read):
+                        reached = True
+                        break
+                    while len(held) > keep:
+                        users.append(held.pop(0).split()[0])
+                previous = page.rows
+                yield from self.__unseen(users, seen)
+                if reached:
+                    break
+            else:
+                yield from self.__unseen([row.split()[0] for row in held], seen)
+            if new_only and newest:
+                self.activity.update(newest)
         except Exception as e:
-            self.lg.error(e)
-            return []
-        else:
-            return list(dict.fromkeys(list_users))
+            print(bad("Error: {}.".format(e)))
+            self.__treat_exception(e)
 
     def get_followed_hashtags(self) -> list:
         """return the hashtags followed by you"""
+        return list(self.iter_followed_hashtags())
+
+    def iter_followed_hashtags(self) -> Iterator[str]:
+        """Like get_followed_hashtags, but yields each hashtag as soon as it is read"""
+        seen = {}
         try:
-            self.__reset_app()
-            fh = []
-            self.d(resourceId="com.instagram.android:id/profile_tab").click()
-            self.d(resourceId="com.instagram.android:id/profile_tab").click()
-            self.d(resourceId="com.instagram.android:id/row_profile_header_following_container").click()
-            self.d(resourceId="com.instagram.android:id/row_hashtag_image").click()
-            self.wait()
-            while not self.d(resourceId="com.instagram.android:id/row_header_textview", text="Suggestions").exists:
-                fh = fh + [lst_btn.info.get("contentDescription").split()[1] for lst_btn in
-                           self.d(resourceId="com.instagram.android:id/follow_button", text="Following") if
-                           self.d(resourceId="com.instagram.android:id/follow_button", text="Following").exists]
-                self.__scroll_elements_vertically(
-                    self.d(resourceId="com.instagram.android:id/follow_list_user_imageview"))
-                if not self.d(resourceId="com.instagram.android:id/action_bar_textview_title").get_text() == "Hashtags":
-                    self.d.press("back")
-
-            fh = fh + [lst_btn.info.get("contentDescription").split()[1] for lst_btn in
-                       self.d(resourceId="com.instagram.android:id/follow_button", text="Following") if
-                       self.d(resourceId="com.instagram.android:id/follow_button", text="Following").exists]
+            self.nav.main_screen()
+            self.sel.profile_tab.on(self.d).click()
+            self.sel.profile_tab.on(self.d).click()
+            self.sel.following_container.on(self.d).click()
+            self.sel.hashtags_entry.on(self.d).click()
+            s = self.waiter.until(lambda h: self.screen(h) == ScreenType.HASHTAG_LIST, label="hashtags")
+
+            def back_to_list(p: ScreenSnapshot) -> bool:
+                if self.screen(p) == ScreenType.HASHTAG_LIST:
+                    return False
+                self.d.press("back")
+                return True
+
+            for page in self.scroller.pages(
+                    lambda p: [lst_btn.description.split()[1] for lst_btn in
+                               self.sel.hashtag_follow_button.extend(text="Following").find(p)],
+                    self.sel.hashtag_image,
+                    end=lambda p: self.sel.list_header.extend(text="Suggestions").exists(p),
+                    action=back_to_list, label="hashtags", first=s):
+                yield from self.__unseen(page.new, seen)
 
         except Exception as e:
             self.lg.error(e)
-            return []
-        else:
-            return list(dict.fromkeys(fh))
 
     def logout_other_devices(self):
-        self.d(resourceId="com.instagram.android:id/profile_tab").click()
-        self.d(resourceId="com.instagram.android:id/profile_tab").click()
-        self.d(description="Options").click()
+        self.sel.profile_tab.on(self.d).click()
+        self.sel.profile_tab.on(self.d).click()
+        self.sel.options.on(self.d).click()
         self.wait()
-        self.d(resourceId="com.instagram.android:id/menu_settings_row").click()
+        self.sel.settings.on(self.d).click()
         self.wait()
-        self.d(resourceId="com.instagram.android:id/row_simple_text_textview", text="Security").click()
+        self.sel.settings_item.extend(text="Security").on(self.d).click()
         self.wait()
-        self.d(resourceId="com.instagram.android:id/row_simple_text_textview", text="Login Activity").click()
+        self.sel.settings_item.extend(text="Login Activity").on(self.d).click()
         self.wait()
-        str_xpath = '//*[@resource-id="android:id/list"]/android.widget.LinearLayout[2]/android.widget.ImageView[2]'
-        while self.d.xpath(str_xpath).exists:
-            self.d.xpath(str_xpath).click()
+        while self.d.xpath(self.sel.other_session).exists:
+            self.d.xpath(self.sel.other_session).click()
             self.d(text="Log Out").click()
             self.d(text="Okay").click()
             print(
                 good("Logout '{}, {}'".format(
-                    self.d(resourceId="com.instagram.android:id/body_message_device").get_text(),
-                    self.d(resourceId="com.instagram.android:id/title_message").get_text())
+                    self.sel.device_body.on(self.d).get_text(),
+                    self.sel.device_title.on(self.d).get_text())
                 )
             )
             self.wait()
@@ -0,0 +1,163 @@
+"""Screenshots and hierarchy dumps of the screens where something failed.
+
+The screen is grabbed by the failing thread, while it still shows the
+failure, and queued; a background thread compresses and writes it, so the
+failing operation goes on as soon as the screen is read. Each capture is one
+zip in the capture directory::
+
+    20260102-153012-123456-<hash>.zip
+        hierarchy.xml   the UI hierarchy, deflated
+        screenshot.jpg  the screen, as sent by the device
+        error.txt       the exception and its traceback
+
+Screens already captured (same hierarchy hash, also across runs) are only
+counted, and the oldest captures are removed once the directory is over its
+disk budget.
+"""
+import atexit
+import datetime
+import hashlib
+import os
+import queue
+import threading
+import time
+import traceback
+import zipfile
+from typing import Dict, NamedTuple, Set
+
+SUFFIX = ".zip"
+
+
+class Failure(NamedTuple):
+    """A failure waiting to be written"""
+    time: datetime.datetime
+    label: str
+    error: str
+    xml: str  #: hierarchy of the screen
+    digest: str  #: hash of xml, part of the file name
+    image: bytes  #: screenshot, jpeg
+
+
+class FailureCapture(object):
+    """Background queue writing failure screens
+
+    Args:
+        d (uiautomator2.Device): device the screens are grabbed from, by the failing thread
+        directory (str): where captures are written
+        budget (int): bytes the captures can use, the oldest are removed beyond it
+        size (int): failures waiting at most, later ones are dropped
+    """
+
+    def __init__(self, d, directory: str = "log/failures", budget: int = 50 * 1024 * 1024, size: int = 8):
+        self.d = d
+        self.directory = directory
+        self.budget = budget
+        self.captured: int = 0
+        self.duplicates: int = 0
+        self.dropped: int = 0
+        self.evicted: int = 0
+        self.__queue: "queue.Queue[Failure]" = queue.Queue(maxsize=size)
+        self.__thread: threading.Thread = None
+        self.__lock = threading.Lock()
+        self.__seen: Set[str] = None
+
+    def capture(self, error: BaseException, label: str = ""):
+        """Grab the screen on display and queue it to be written, the
+        screenshot is only taken for a screen not captured yet. Never waits
+        on the disk, nor on the device when the queue is full.
+
+        Args:
+            error (Exception): what failed
+            label (str): where it failed, e.g. the method name
+        """
+        if self.__queue.full():
+            self.dropped += 1
+            return
+        try:
+            xml = self.d.dump_hierarchy()
+        except Exception:
+            # the device may be gone, losing a capture is better than failing the run
+            return
+        # the hash decides if a screenshot is needed, it has to be known here
+        digest = hashlib.sha1(xml.encode("utf-8")).hexdigest()[:16]
+        with self.__lock:
+            if self.__seen is None:
+                os.makedirs(self.directory, exist_ok=True)
+                self.__seen = {f[:-len(SUFFIX)].rsplit("-", 1)[-1] for f in self.__files()}
+            if digest in self.__seen:
+                self.duplicates += 1
+                return
+            self.__seen.add(digest)
+        try:
+            image = self.d.screenshot(format="raw")
+        except Exception:
+            image = None
+        text = "".join(traceback.format_exception(type(error), error, error.__traceback__))
+        try:
+            self.__queue.put_nowait(Failure(datetime.datetime.now(), label, text, xml, digest, image))
+        except queue.Full:
+            with self.__lock:
+                self.__seen.discard(digest)
+            self.dropped += 1
+            return
+        with self.__lock:
+            if self.__thread is None:
+                self.__thread = threading.Thread(target=self.__run, name="failure-capture", daemon=True)
+                self.__thread.start()
+                # the thread is a daemon, write what is queued before exiting
+                atexit.register(self.flush)
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Wait until the queued failures are written, False on timeout"""
+        end = time.monotonic() + timeout
+        while self.__queue.unfinished_tasks:
+            if time.monotonic() >= end:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def report(self) -> Dict[str, int]:
+        return {"captured": self.captured, "duplicates": self.duplicates, "dropped": self.dropped,
+                "evicted": self.evicted}
+
+    def __run(self):
+        while True:
+            failure = self.__queue.get()
+            try:
+                self.__write(failure)
+            except Exception:
+                # e.g. a full disk, losing a capture is better than failing the run
+                with self.__lock:
+                    self.__seen.discard(failure.digest)
+            finally:
+                self.__queue.task_done()
+
+    def __files(self):
+        return sorted(f for f in os.listdir(self.directory) if f.endswith(SUFFIX))
+
+    def __write(self, failure: Failure):
+        name = "{}-{}{}".format(failure.time.strftime("%Y%m%d-%H%M%S-%f"), failure.digest, SUFFIX)
+        path = os.path.join(self.directory, name)
+        tmp = "{}.tmp".format(path)
+        with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_DEFLATED) as z:
+            z.writestr("hierarchy.xml", failure.xml)
+            if failure.image:
+                # already a jpeg, deflating it again only costs time
+                z.writestr("screenshot.jpg", failure.image, compress_type=zipfile.ZIP_STORED)
+            z.writestr("error.txt", "{}\n{}".format(failure.label, failure.error))
+        os.replace(tmp, path)
+        self.captured += 1
+        self.__evict()
+
+    def __evict(self):
+        """Remove the oldest captures until the directory fits the budget"""
+        files = [(f, os.path.getsize(os.path.join(self.directory, f))) for f in self.__files()]
+        total = sum(size for _, size in files)
+        for f, size in files[:-1]:  # the newest is kept even if it is larger than the budget
+            if total <= self.budget:
+                break
+            os.remove(os.path.join(self.directory, f))
+            with self.__lock:
+                self.__seen.discard(f[:-len(SUFFIX)].rsplit("-", 1)[-1])
+            total -= size
+            self.evicted += 1
@@ -0,0 +1,80 @@
+"""Where the bot's delays come from.
+
+Every pause of Burbnbot (``wait()``, the throttle after a like, the polls of
+a Waiter) goes through its clock. ``Clock`` really sleeps, ``VirtualClock``
+only moves its time forward and returns at once, and keeps how long was
+slept from each call site, so a replayed or benchmarked run takes no time
+and still shows which sleeps would dominate a real one::
+
+    clock = VirtualClock()
+    bot = Burbnbot(device=ReplayDevice.load("scenarios/follow"), clock=clock)
+    bot.like_n_swipe(amount=20)
+    print(clock.report())  # {"burbnbot.py:743 like_n_swipe": 80.0, ...}
+"""
+import os
+import sys
+import time
+from typing import Callable, Dict
+
+#: code of the functions that only pass a delay on, the call site is the code calling them
+_HELPERS = set()
+_SKIPPED_FILES = {os.path.join(os.path.dirname(__file__), name) for name in ("clock.py", "metrics.py", "tracing.py")}
+
+
+def delay(fn: Callable) -> Callable:
+    """Mark a function that sleeps on behalf of its caller, e.g. a wait
+    helper, its caller is logged as the call site instead"""
+    _HELPERS.add(fn.__code__)
+    return fn
+
+
+def call_site() -> str:
+    """``file:line function`` of the code that asked for the current delay"""
+    frame = sys._getframe(1)
+    while frame is not None and (frame.f_code in _HELPERS or frame.f_code.co_filename in _SKIPPED_FILES):
+        frame = frame.f_back
+    if frame is None:
+        return "unknown"
+    return "{}:{} {}".format(os.path.basename(frame.f_code.co_filename), frame.f_lineno, frame.f_code.co_name)
+
+
+class Clock(object):
+    """Real time"""
+
+    def time(self) -> float:
+        """Seconds since the epoch"""
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+
+class VirtualClock(Clock):
+    """Time that only moves when something sleeps, sleeping returns at once
+
+    Args:
+        start (float): seconds since the epoch the clock starts at, now if None
+    """
+
+    def __init__(self, start: float = None):
+        self.start = time.time() if start is None else start
+        self.elapsed: float = 0.0  #: seconds slept since the start
+        self.sites: Dict[str, float] = {}  #: seconds slept by call site
+
+    def time(self) -> float:
+        return self.start + self.elapsed
+
+    def monotonic(self) -> float:
+        return self.elapsed
+
+    def sleep(self, seconds: float):
+        self.elapsed += seconds
+        site = call_site()
+        self.sites[site] = self.sites.get(site, 0.0) + seconds
+
+    def report(self) -> Dict[str, float]:
+        """Seconds slept by call site, the longest first"""
+        return {k: round(v, 3) for k, v in sorted(self.sites.items(), key=lambda kv: -kv[1])}
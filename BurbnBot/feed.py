@@ -0,0 +1,133 @@
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
+
+from .snapshot import Bounds, Node, ScreenSnapshot
+from .versions import Selectors, latest
+
+#: parts of a post, each is a separate row of the feed list, and their names in BurbnBot.versions
+_PARTS = (("author", "post_author"), ("sponsored", "sponsored_label"), ("photo", "post_photo"),
+          ("carousel", "carousel"), ("like", "like_button"))
+
+
+class MediaType(object):
+    """Type of medias on Instagram"""
+    PHOTO: int = 1  #: Photo media type
+    VIDEO: int = 2  #: Video media type
+    CAROUSEL: int = 8  #: A album with photos and/or videos
+
+
+class Post(NamedTuple):
+    """A post of a feed as shown in one snapshot"""
+    key: Optional[str]  #: author and media description, None if neither is on screen
+    author: Optional[str]
+    media_type: int  #: one of MediaType
+    sponsored: bool
+    liked: bool
+    bounds: Bounds  #: on-screen part of the post
+    like: Optional[Node]  #: like button, None while it is off screen
+
+
+def _post(parts: Dict[str, Node]) -> Post:
+    author = parts.get("author")
+    author = author.text.split()[0] if author is not None and author.text.strip() else None
+    photo = parts.get("photo")
+    if "carousel" in parts:
+        media_type = MediaType.CAROUSEL
+    elif photo is not None and photo.description.startswith("Video by "):
+        media_type = MediaType.VIDEO
+    else:
+        media_type = MediaType.PHOTO
+    media = next((n.description for n in (photo, parts.get("carousel")) if n is not None and n.description), "")
+    like = parts.get("like")
+    b = [n.bounds for n in parts.values()]
+    return Post(key="{}|{}".format(author or "", media) if author or media else None,
+                author=author,
+                media_type=media_type,
+                sponsored="sponsored" in parts,
+                liked=like is not None and like.description != "Like",
+                bounds=Bounds(min(x.left for x in b), min(x.top for x in b), max(x.right for x in b),
+                              max(x.bottom for x in b)),
+                like=like)
+
+
+def posts(s: ScreenSnapshot, sel: Selectors = None) -> List[Post]:
+    """Every post visible in a snapshot, top to bottom
+
+    Args:
+        s (ScreenSnapshot): screen showing a feed
+        sel (Selectors): selectors of the app version, the newest if None
+    """
+    sel = sel or latest()
+    found = []
+    for kind, name in _PARTS:
+        for n in getattr(sel, name).find(s):
+            if kind != "sponsored" or n.text == "Sponsored":
+                found.append((n.bounds.top, kind, n))
+    found.sort(key=lambda f: f[0])
+    groups = []
+    for _, kind, n in found:
+        # a post starts at its author, or at any part the current post already has
+        # when the author is scrolled off
+        if not groups or kind == "author" or kind in groups[-1]:
+            groups.append({})
+        groups[-1][kind] = n
+    return [_post(g) for g in groups]
+
+
+class FeedWalker(object):
+    """Walks the feed on screen, one snapshot per scroll position, and yields
+    each post once its like button is visible
+
+    Args:
+        d (uiautomator2.Device): device
+        scroller (Scroller): used to swipe the feed
+        patience (int): scroll positions in a row without a new post before
+            giving up
+        sel (Selectors): selectors of the app version, the newest if None
+    """
+
+    def __init__(self, d, scroller, patience: int = 3, sel: Selectors = None):
+        self.d = d
+        self.scroller = scroller
+        self.patience = patience
+        self.sel = sel or latest()
+        self.handled: Dict[str, None] = {}  #: keys of the posts already yielded
+        self.positions: int = 0  #: scroll positions read
+
+    def __swipe(self, s: ScreenSnapshot, page: List[Post]):
+        """Bring the last post of the page to the top of the feed"""
+        container = self.sel.feed_container.first(s)
+        if container is None:
+            return
+        top = page[-1].bounds.top if page else container.bounds.bottom
+        if top - container.bounds.top < (container.bounds.bottom - container.bounds.top) / 4:
+            self.scroller.swipe_node_up(container)
+        else:
+            x = (container.bounds.left + container.bounds.right) / 2
+            self.d.swipe(x, top, x, container.bounds.top, duration=0)
+
+    def walk(self, recover: Callable[[ScreenSnapshot], None] = None) -> Iterator[Post]:
+        """Yield the posts of the feed on screen, skipping the ones already
+        yielded. Act on a post before asking for the next one, its bounds are
+        only valid until the feed is swiped.
+
+        Args:
+            recover (callable): called with the snapshot when no post is on screen
+        """
+        stalled = 0
+        while stalled < self.patience:
+            s = ScreenSnapshot.from_device(self.d)
+            self.positions += 1
+            page = posts(s, self.sel)
+            if not page and recover is not None:
+                recover(s)
+            new = 0
+            for p in page:
+                if p.like is None or (p.key is not None and p.key in self.handled):
+                    continue
+                if p.key is not None:
+                    self.handled[p.key] = None
+                new += 1
+                yield p
+            stalled = 0 if new else stalled + 1
+            if page:
+                self.__swipe(s, page)
@@ -0,0 +1,21 @@
+import json
+import os
+
+
+def write_atomic(path: str, text: str):
+    """Write a text file through a temporary file replaced in one step, so a
+    crash never leaves it half written
+
+    Args:
+        path (str): file to write
+        text (str): its whole content
+    """
+    tmp = "{}.tmp".format(path)
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def write_json(path: str, data):
+    """Write data as JSON, replacing the file atomically, see write_atomic"""
+    write_atomic(path, json.dumps(data))
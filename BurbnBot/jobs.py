@@ -0,0 +1,238 @@
+"""Run a plan file instead of a hand-written script.
+
+The plan lists what to do, the runner decides the order: every unfollow goes
+through a single search of the Following list, the work on each profile is
+done in one visit, then the hashtags and the home feed. Every finished task
+is written to a checkpoint file so an interrupted run continues where it
+stopped::
+
+    python -m BurbnBot.jobs plan.json -d emulator-5554
+
+A plan, in JSON or YAML (needs PyYAML)::
+
+    {
+        "unfollow": {"non_followers": true, "users": ["someone"], "keep": ["friend"]},
+        "profiles": [{"username": "badgalriri", "likes": 3, "follow": true, "save": "inspiration"}],
+        "tags": [{"tag": "creative", "tab": "Recent", "likes": 5}],
+        "home_feed": {"likes": 15}
+    }
+
+``profiles`` and ``tags`` also accept plain names, with one like each.
+"""
+import argparse
+import json
+import os
+import sys
+from typing import Dict, List, NamedTuple
+
+from huepy import *
+
+from .files import write_json
+
+
+class TaskKind(object):
+    """Kinds of task, in the order the runner does them"""
+    UNFOLLOW: str = "unfollow"
+    PROFILE: str = "profile"
+    TAG: str = "tag"
+    HOME_FEED: str = "home_feed"
+
+
+_ORDER = (TaskKind.UNFOLLOW, TaskKind.PROFILE, TaskKind.TAG, TaskKind.HOME_FEED)
+
+
+class Task(NamedTuple):
+    kind: str
+    target: str
+    params: dict
+
+    @property
+    def id(self) -> str:
+        return "{}:{}".format(self.kind, self.target)
+
+
+def load_plan(path: str) -> dict:
+    """Read a JSON or YAML plan
+
+    Args:
+        path (str): .json, .yaml or .yml file
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("PyYAML is needed for YAML plans: pip install pyyaml")
+            return yaml.safe_load(f) or {}
+        return json.load(f)
+
+
+def _entries(items: list, key: str) -> List[dict]:
+    return [{key: i} if isinstance(i, str) else dict(i) for i in items or []]
+
+
+def plan_tasks(plan: dict) -> List[Task]:
+    """Turn a plan into tasks, grouped and ordered to share navigation. The
+    targets of a non_followers unfollow are only known once the lists are
+    read, see JobRunner.
+
+    Args:
+        plan (dict): plan as returned by load_plan
+    """
+    tasks: Dict[str, Task] = {}
+
+    def add(task: Task):
+        if task.id in tasks:
+            # the same profile or tag twice, do it once with the params merged
+            task = task._replace(params={**tasks[task.id].params, **task.params})
+        tasks[task.id] = task
+
+    unfollow = plan.get("unfollow") or {}
+    for u in unfollow.get("users", []):
+        add(Task(TaskKind.UNFOLLOW, u, {}))
+    for p in _entries(plan.get("profiles"), "username"):
+        username = p.pop("username")
+        p.setdefault("likes", 1)
+        add(Task(TaskKind.PROFILE, username, p))
+    for t in _entries(plan.get("tags"), "tag"):
+        tag = t.pop("tag")
+        t.setdefault("tab", "Recent")
+        t.setdefault("likes", 1)
+        add(Task(TaskKind.TAG, "{}/{}".format(tag, t["tab"]), dict(t, tag=tag)))
+    if plan.get("home_feed"):
+        add(Task(TaskKind.HOME_FEED, "home", dict(plan["home_feed"])))
+    return sorted(tasks.values(), key=lambda t: (_ORDER.index(t.kind), t.target))
+
+
+class JobRunner(object):
+    """Runs the tasks of a plan on a Burbnbot, checkpointing each one
+
+    Args:
+        bot (Burbnbot): bot to run the plan on
+        plan (dict): plan as returned by load_plan
+        checkpoint (str): JSON file with the tasks already finished, the run
+            resumes from it. Removed when the whole plan is done.
+    """
+
+    def __init__(self, bot, plan: dict, checkpoint: str):
+        self.bot = bot
+        self.plan = plan
+        self.checkpoint = checkpoint
+        self.state = {"done": {}, "unfollow": None}
+        if os.path.exists(checkpoint):
+            with open(checkpoint, encoding="utf-8") as f:
+                self.state = json.load(f)
+
+    def __save(self):
+        write_json(self.checkpoint, self.state)
+
+    def __finish(self, task: Task, result):
+        self.state["done"][task.id] = result
+        self.__save()
+
+    def tasks(self) -> List[Task]:
+        """Tasks of the plan, including the unfollows of users that don't
+        follow back once the lists were read"""
+        tasks = plan_tasks(self.plan)
+        extra = [Task(TaskKind.UNFOLLOW, u, {}) for u in self.state["unfollow"] or []]
+        known = {t.id for t in tasks}
+        return sorted(tasks + [t for t in extra if t.id not in known],
+                      key=lambda t: (_ORDER.index(t.kind), t.target))
+
+    def pending(self) -> List[Task]:
+        """Tasks not done yet, or that failed and are tried again"""
+        return [t for t in self.tasks() if self.state["done"].get(t.id, False) is False]
+
+    def __non_followers(self):
+        """Read the lists once and keep the result in the checkpoint"""
+        unfollow = self.plan.get("unfollow") or {}
+        if not unfollow.get("non_followers") or self.state["unfollow"] is not None:
+            return
+        following = self.bot.get_following_list()
+        followers = self.bot.get_followers_list()
+        if not following:
+            raise RuntimeError("Couldn't read the following list")
+        self.state["unfollow"] = self.bot.non_followers(following, followers)
+        self.__save()
+
+    def __unfollow(self, tasks: List[Task]):
+        keep = set((self.plan.get("unfollow") or {}).get("keep", []))
+        report = self.bot.bulk_unfollow([t.target for t in tasks], keep=keep)
+        for t in tasks:
+            # users kept are finished too, there is nothing to do with them
+            self.__finish(t, report.get(t.target, False) if t.target not in keep else "kept")
+
+    def __profile(self, task: Task):
+        p = task.params
+        ok = self.bot.visit_profile(task.target, likes=p.get("likes", 0), follow=bool(p.get("follow")),
+                                    save=p.get("save") or False)
+        self.__finish(task, ok)
+
+    def __tag(self, task: Task):
+        ok = self.bot.open_tag(tag=task.params["tag"], tab=task.params["tab"])
+        if ok:
+            self.bot.like_n_swipe(task.params["likes"])
+        self.__finish(task, bool(ok))
+
+    def __home_feed(self, task: Task):
+        ok = self.bot.open_home_feed()
+        if ok:
+            self.bot.like_n_swipe(task.params.get("likes", 1))
+        self.__finish(task, bool(ok))
+
+    def run(self) -> Dict[str, object]:
+        """Run the pending tasks, returns the result of every task of the plan"""
+        self.__non_followers()
+        pending = self.pending()
+        print(good("{} tasks to do, {} already done".format(len(pending), len(self.tasks()) - len(pending))))
+        unfollows = [t for t in pending if t.kind == TaskKind.UNFOLLOW]
+        if unfollows:
+            try:
+                self.__unfollow(unfollows)
+            except Exception as e:
+                print(bad("Unfollows failed: {}".format(e)))
+                self.bot.lg.exception(e)
+                for t in unfollows:
+                    if t.id not in self.state["done"]:
+                        self.__finish(t, False)
+        for task in pending:
+            try:
+                if task.kind == TaskKind.PROFILE:
+                    self.__profile(task)
+                elif task.kind == TaskKind.TAG:
+                    self.__tag(task)
+                elif task.kind == TaskKind.HOME_FEED:
+                    self.__home_feed(task)
+            except Exception as e:
+                print(bad("Task {} failed: {}".format(task.id, e)))
+                self.bot.lg.exception(e)
+                self.__finish(task, False)
+        results = dict(self.state["done"])
+        if not self.pending() and os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+        return results
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Run a Burbnbot plan")
+    parser.add_argument("plan", type=str, help="JSON or YAML plan")
+    parser.add_argument("-d", "--device", type=str, help="Device serial number")
+    parser.add_argument("--checkpoint", type=str, help="progress file, <plan>.progress.json by default")
+    parser.add_argument("--metrics", type=str, help="directory to write burbnbot.prom and burbnbot.json to")
+    parser.add_argument("--trace", type=str, help="Chrome trace-event file of the run")
+    # Burbnbot reads -d from the command line itself when device is None
+    args = parser.parse_args(argv)
+
+    from .burbnbot import Burbnbot
+
+    plan = load_plan(args.plan)
+    bot = Burbnbot(device=args.device, metrics_dir=args.metrics, trace=args.trace)
+    results = JobRunner(bot, plan, args.checkpoint or "{}.progress.json".format(os.path.splitext(args.plan)[0])).run()
+    failed = [k for k, v in results.items() if v is False]
+    for k in failed:
+        print(bad("Failed: {}".format(k)))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+import datetime
+import json
+import os
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+
+class Action(object):
+    """Mutating actions kept in the ActionJournal"""
+    LIKE: str = "like"  #: target is the post key, see feed.Post
+    FOLLOW: str = "follow"  #: target is the username
+    UNFOLLOW: str = "unfollow"  #: target is the username
+    SAVE: str = "save"  #: target is "collection/username"
+
+
+#: an action is undone by a later entry of its opposite
+_OPPOSITE = {Action.FOLLOW: Action.UNFOLLOW, Action.UNFOLLOW: Action.FOLLOW}
+
+
+class Entry(NamedTuple):
+    action: str
+    target: str
+    result: object
+    time: str
+
+
+class ActionJournal(object):
+    """Append-only log of the actions already done on the device, one JSON
+    object per line. Methods that change something on Instagram check it
+    first, so a job rerun after a crash doesn't repeat them.
+
+    Args:
+        path (str): journal file, created if it doesn't exist
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.__last: Dict[Tuple[str, str], Tuple[int, Entry]] = {}
+        self.__seq = 0
+        if os.path.exists(path):
+            for e in self.__read(path):
+                self.__index(e)
+        self.__file = open(path, "a", encoding="utf-8")
+
+    @staticmethod
+    def __read(path: str) -> Iterable[Entry]:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield Entry(**json.loads(line))
+                except ValueError:
+                    continue  # empty line, or the last one cut by a crash
+
+    def __index(self, e: Entry):
+        self.__seq += 1
+        self.__last[(e.action, e.target)] = (self.__seq, e)
+
+    def __append(self, e: Entry):
+        self.__file.write(json.dumps(e._asdict()) + "\n")
+        self.__index(e)
+
+    def close(self):
+        self.__file.close()
+
+    def record(self, action: str, target: str, result: object = True):
+        """Add a successful action
+
+        Args:
+            action (str): one of Action
+            target (str): what the action was done to
+            result: value returned by the method, given back on reruns
+        """
+        self.__append(Entry(action, target, result, datetime.datetime.now().isoformat(timespec="seconds")))
+        self.__file.flush()
+
+    def get(self, action: str, target: str) -> Optional[Entry]:
+        """The entry of an action still in effect, None if it wasn't done or
+        was undone afterwards (a follow after an unfollow and vice versa)"""
+        last = self.__last.get((action, target))
+        if last is None:
+            return None
+        undo = self.__last.get((_OPPOSITE.get(action), target))
+        if undo is not None and undo[0] > last[0]:
+            return None
+        return last[1]
+
+    def done(self, action: str, target: str) -> bool:
+        return self.get(action, target) is not None
+
+    def pending(self, action: str, targets: Iterable[str]) -> List[str]:
+        """Targets the action wasn't done to yet, in order and without
+        duplicates, no device needed"""
+        return [t for t in dict.fromkeys(targets) if not self.done(action, t)]
+
+    def entries(self, action: str = None) -> List[Entry]:
+        """Actions in effect, oldest first
+
+        Args:
+            action (str): only this action, every action if None
+        """
+        found = [(seq, e) for (a, t), (seq, e) in self.__last.items()
+                 if (action is None or a == action) and self.get(a, t) is e]
+        return [e for _, e in sorted(found, key=lambda f: f[0])]
+
+    def export(self, path: str, action: str = None) -> int:
+        """Write the actions in effect to a journal file, returns how many
+
+        Args:
+            path (str): destination file, overwritten
+            action (str): only this action, every action if None
+        """
+        entries = self.entries(action)
+        with open(path, "w", encoding="utf-8") as f:
+            for e in entries:
+                f.write(json.dumps(e._asdict()) + "\n")
+        return len(entries)
+
+    def import_file(self, path: str) -> int:
+        """Append the entries of another journal or export that are not in
+        this one yet, returns how many were added
+
+        Args:
+            path (str): journal file to read
+        """
+        added = 0
+        for e in self.__read(path):
+            undo = self.get(_OPPOSITE.get(e.action), e.target)
+            if self.get(e.action, e.target) is None and (undo is None or undo.time < e.time):
+                self.__append(e)
+                added += 1
+        self.__file.flush()
+        return added
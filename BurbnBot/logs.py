@@ -0,0 +1,83 @@
+"""Log files of the bot, set up once per process.
+
+Two files are written in the log directory, through loguru's background
+queue so the automation thread never waits on the disk:
+
+    2026-01-02.log            the human log, DEBUG and above
+    events-2026-01-02.jsonl   one JSON object per action, see ``event``
+
+Both start a new file every day and when they grow over ``size`` bytes, and
+are removed after ``retention``.
+"""
+import json
+import os
+import threading
+import time
+
+from loguru import logger
+
+#: loguru level of the event stream, below DEBUG so events stay out of the human log and the console
+EVENT = "EVENT"
+
+_lock = threading.Lock()
+_pid: int = None
+
+
+class _Rotation(object):
+    """Rotate on a new day or once the file would go over size bytes"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.day = None
+
+    def __call__(self, message, file) -> bool:
+        day = message.record["time"].date()
+        if self.day is None:
+            self.day = day
+        if day != self.day:
+            self.day = day
+            return True
+        return file.tell() + len(message) > self.size
+
+
+def setup(directory: str = "log", level: str = "DEBUG", size: int = 10 * 1024 * 1024,
+          retention: str = "30 days"):
+    """Add the file sinks, only the first call of a process does something
+
+    Args:
+        directory (str): where the files are written
+        level (str): lowest level of the human log
+        size (int): bytes a file can grow to before a new one is started
+        retention (str): how long rotated files are kept, in loguru's format
+    """
+    global _pid
+    with _lock:
+        if _pid == os.getpid():
+            return logger
+        _pid = os.getpid()
+        try:
+            logger.level(EVENT)
+        except ValueError:
+            logger.level(EVENT, no=3)
+        logger.add(os.path.join(directory, "{time:YYYY-MM-DD}.log"), level=level, enqueue=True,
+                   rotation=_Rotation(size), retention=retention)
+        logger.add(os.path.join(directory, "events-{time:YYYY-MM-DD}.jsonl"), level=EVENT, format="{message}",
+                   enqueue=True, rotation=_Rotation(size), retention=retention,
+                   filter=lambda record: record["level"].name == EVENT)
+    return logger
+
+
+def event(action: str, target: str, outcome: str, duration: float = None, **fields):
+    """Write an event to the JSONL stream
+
+    Args:
+        action (str): e.g. Action.LIKE
+        target (str): what it was done to, e.g. a username
+        outcome (str): "done", "failed" or "skipped"
+        duration (float): seconds the action took, None if it wasn't tried
+        **fields: anything else worth keeping, e.g. the device serial
+    """
+    e = {"time": round(time.time(), 3), "action": action, "target": target, "outcome": outcome,
+         "duration": None if duration is None else round(duration, 3)}
+    e.update(fields)
+    logger.log(EVENT, json.dumps(e, ensure_ascii=False))
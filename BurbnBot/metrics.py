@@ -0,0 +1,313 @@
+"""Call counts, latencies, sleeps and items produced by a Burbnbot run.
+
+Every public Burbnbot method is timed by ``instrument`` and every device call
+by ``InstrumentedDevice``. ``Metrics.write_prometheus`` writes the numbers in
+the Prometheus text format (for a node exporter textfile collector) and
+``Metrics.write_json`` a summary with means, percentiles and items per second.
+"""
+import bisect
+import functools
+import inspect
+import json
+import os
+import time
+from typing import Callable, Dict, List, Tuple
+
+from . import tracing
+from .files import write_atomic
+
+#: upper bounds, in seconds, of the latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+class Histogram(object):
+    """Latencies of one method or RPC"""
+
+    def __init__(self):
+        self.counts: List[int] = [0] * (len(BUCKETS) + 1)  # the last one is +Inf
+        self.count: int = 0
+        self.sum: float = 0.0
+        self.errors: int = 0
+        self.items: int = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q quantile"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS + (float("inf"),), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def summary(self) -> dict:
+        return {"count": self.count, "errors": self.errors, "seconds": round(self.sum, 4),
+                "mean": round(self.sum / self.count, 4) if self.count else 0.0,
+                "p50": self.quantile(0.5), "p95": self.quantile(0.95), "items": self.items,
+                "items_per_second": round(self.items / self.sum, 3) if self.sum else 0.0}
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    return ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in labels.items())
+
+
+class Metrics(object):
+    """Registry of the numbers of a run
+
+    Args:
+        labels (dict): added to every Prometheus sample, e.g. the device serial
+    """
+
+    def __init__(self, labels: Dict[str, str] = None):
+        self.labels = labels or {}
+        self.methods: Dict[str, Histogram] = {}
+        self.rpcs: Dict[str, Histogram] = {}
+        self.sleeps: Dict[str, float] = {}
+        self.started = time.time()
+        self.startup: float = 0.0  #: seconds spent constructing the bot and in ensure_ready
+
+    def method(self, name: str) -> Histogram:
+        h = self.methods.get(name)
+        if h is None:
+            h = self.methods[name] = Histogram()
+        return h
+
+    def rpc(self, name: str) -> Histogram:
+        h = self.rpcs.get(name)
+        if h is None:
+            h = self.rpcs[name] = Histogram()
+        return h
+
+    def slept(self, source: str, seconds: float):
+        """Count time spent sleeping, by where the sleep comes from"""
+        self.sleeps[source] = self.sleeps.get(source, 0.0) + seconds
+
+    def summary(self) -> dict:
+        return {"labels": self.labels, "started": self.started, "seconds": round(time.time() - self.started, 3),
+                "startup_seconds": round(self.startup, 3),
+                "methods": {k: h.summary() for k, h in sorted(self.methods.items())},
+                "rpcs": {k: h.summary() for k, h in sorted(self.rpcs.items())},
+                "sleep_seconds": {k: round(v, 3) for k, v in sorted(self.sleeps.items())}}
+
+    def prometheus(self) -> str:
+        """Every metric in the Prometheus text exposition format"""
+        out = []
+
+        def histogram(metric: str, help_text: str, label: str, hs: Dict[str, Histogram]):
+            out.append("# HELP {} {}".format(metric, help_text))
+            out.append("# TYPE {} histogram".format(metric))
+            for name, h in sorted(hs.items()):
+                base = dict(self.labels, **{label: name})
+                cumulative = 0
+                for bound, n in zip(BUCKETS + (float("inf"),), h.counts):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    out.append("{}_bucket{{{}}} {}".format(metric, _labels(dict(base, le=le)), cumulative))
+                out.append("{}_sum{{{}}} {}".format(metric, _labels(base), repr(h.sum)))
+                out.append("{}_count{{{}}} {}".format(metric, _labels(base), h.count))
+
+        def counter(metric: str, help_text: str, samples: List[Tuple[Dict[str, str], float]]):
+            out.append("# HELP {} {}".format(metric, help_text))
+            out.append("# TYPE {} counter".format(metric))
+            for labels, value in samples:
+                out.append("{}{{{}}} {}".format(metric, _labels(dict(self.labels, **labels)), value))
+
+        out.append("# HELP burbnbot_startup_seconds Time spent constructing the bot and getting the app ready")
+        out.append("# TYPE burbnbot_startup_seconds gauge")
+        out.append("burbnbot_startup_seconds{{{}}} {}".format(_labels(self.labels), repr(self.startup)))
+        histogram("burbnbot_method_seconds", "Time spent in public Burbnbot methods", "method", self.methods)
+        counter("burbnbot_method_errors_total", "Exceptions raised by public Burbnbot methods",
+                [({"method": k}, h.errors) for k, h in sorted(self.methods.items())])
+        counter("burbnbot_method_items_total", "Items returned or yielded by public Burbnbot methods",
+                [({"method": k}, h.items) for k, h in sorted(self.methods.items())])
+        histogram("burbnbot_rpc_seconds", "Time spent in device calls", "rpc", self.rpcs)
+        counter("burbnbot_rpc_errors_total", "Device calls that raised",
+                [({"rpc": k}, h.errors) for k, h in sorted(self.rpcs.items())])
+        counter("burbnbot_sleep_seconds_total", "Time spent sleeping",
+                [({"source": k}, round(v, 3)) for k, v in sorted(self.sleeps.items())])
+        return "\n".join(out) + "\n"
+
+    def write_prometheus(self, path: str):
+        write_atomic(path, self.prometheus())
+
+    def write_json(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def export(self, directory: str, name: str = "burbnbot"):
+        """Write <name>.prom and <name>.json in directory"""
+        os.makedirs(directory, exist_ok=True)
+        self.write_prometheus(os.path.join(directory, "{}.prom".format(name)))
+        self.write_json(os.path.join(directory, "{}.json".format(name)))
+
+
+def _items(result) -> int:
+    """Items in a method result: its length, or a count like the posts liked"""
+    if isinstance(result, (list, dict, set, tuple)):
+        return len(result)
+    return result if isinstance(result, int) and not isinstance(result, bool) else 0
+
+
+def _timed_method(fn: Callable) -> Callable:
+    name = fn.__name__
+    if inspect.isgeneratorfunction(fn):
+        @functools.wraps(fn)
+        def generator(self, *args, **kwargs):
+            h = self.metrics.method(name)
+            spent = 0.0
+            it = fn(self, *args, **kwargs)
+            try:
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        item = next(it)
+                    except StopIteration:
+                        return
+                    finally:
+                        end = time.perf_counter()
+                        spent += end - start
+                        if tracing.active() is not None:
+                            # one span per item, the caller runs in between
+                            tracing.active().complete(name, "method", start, end, {"item": h.items})
+                    h.items += 1
+                    yield item
+            except Exception:
+                h.errors += 1
+                raise
+            finally:
+                # only the time spent producing items, not the caller's
+                it.close()
+                h.observe(spent)
+
+        return generator
+
+    @functools.wraps(fn)
+    def method(self, *args, **kwargs):
+        h = self.metrics.method(name)
+        start = time.perf_counter()
+        try:
+            result = fn(self, *args, **kwargs)
+        except BaseException:
+            h.errors += 1
+            raise
+        finally:
+            end = time.perf_counter()
+            h.observe(end - start)
+            if tracing.active() is not None:
+                tracing.active().complete(name, "method", start, end, _trace_args(args, kwargs))
+        h.items += _items(result)
+        return result
+
+    return method
+
+
+def _trace_args(args: tuple, kwargs: dict) -> dict:
+    """Arguments of a call as shown in a trace, only built when tracing"""
+    out = {k: repr(v)[:200] for k, v in kwargs.items()}
+    if args:
+        out["args"] = repr(args)[:200]
+    return out
+
+
+def instrument(cls):
+    """Class decorator timing every public method through ``self.metrics``"""
+    for name, value in list(vars(cls).items()):
+        if not name.startswith("_") and inspect.isfunction(value):
+            setattr(cls, name, _timed_method(value))
+    return cls
+
+
+def _is_selector(value) -> bool:
+    # UiObject, XPathSelector and their replay versions
+    return hasattr(type(value), "exists") and not isinstance(value, (str, bytes, dict, list, tuple))
+
+
+class _Timed(object):
+    """Proxy timing every method call and property read of a device object"""
+
+    def __init__(self, target, metrics: Metrics, prefix: str, before: Callable[[], None] = None):
+        object.__setattr__(self, "_target", target)
+        object.__setattr__(self, "_metrics", metrics)
+        object.__setattr__(self, "_prefix", prefix)
+        object.__setattr__(self, "_before", before)
+
+    def __wrap(self, value):
+        return _Timed(value, self._metrics, "selector.", self._before) if _is_selector(value) else value
+
+    def __time(self, name: str, call: Callable, args: tuple = (), kwargs: dict = None):
+        if self._before is not None:
+            self._before()
+        h = self._metrics.rpc(self._prefix + name)
+        start = time.perf_counter()
+        try:
+            return call()
+        except BaseException:
+            h.errors += 1
+            raise
+        finally:
+            end = time.perf_counter()
+            h.observe(end - start)
+            if tracing.active() is not None:
+                trace = _trace_args(args, kwargs or {})
+                selector = getattr(self._target, "selector", None)
+                if selector is not None:
+                    # which query blocked
+                    trace["selector"] = repr(selector)[:200]
+                elif self._prefix == "xpath.":
+                    trace["selector"] = repr(self._target)[:200]
+                tracing.active().complete(self._prefix + name, "rpc", start, end, trace)
+
+    def __getattr__(self, name: str):
+        if name == "xpath" and not self._prefix:
+            # a cached_property on a Device, a method on a ReplayDevice, neither is an RPC
+            return _Timed(getattr(self._target, name), self._metrics, "xpath.", self._before)
+        if callable(getattr(type(self._target), name, None)):
+            method = getattr(self._target, name)
+            return lambda *args, **kwargs: self.__wrap(
+                self.__time(name, lambda: method(*args, **kwargs), args, kwargs))
+        # properties such as Device.info or UiObject.exists are RPCs too
+        return self.__wrap(self.__time(name, lambda: getattr(self._target, name)))
+
+    def __setattr__(self, name: str, value):
+        setattr(self._target, name, value)
+
+    def __call__(self, *args, **kwargs):
+        # d(**selector) and d.xpath(...) only build the selector, the device is queried later
+        value = self._target(*args, **kwargs)
+        if self._prefix == "xpath.":
+            # exists, click, get_text... of the xpath selector
+            return _Timed(value, self._metrics, "xpath.", self._before)
+        return self.__wrap(value)
+
+    def __getitem__(self, item):
+        return self.__wrap(self._target[item])
+
+    def __iter__(self):
+        return (self.__wrap(v) for v in self._target)
+
+    def __len__(self):
+        return len(self._target)
+
+    def __bool__(self):
+        return bool(self._target)
+
+
+class InstrumentedDevice(_Timed):
+    """Wraps a uiautomator2.Device (or ReplayDevice) so its calls are timed in
+    metrics, the selectors and xpath objects it returns are wrapped too
+
+    Args:
+        d (uiautomator2.Device): device
+        metrics (Metrics): where the calls are recorded
+        before (callable): called before each call reaches the device, not timed
+    """
+
+    def __init__(self, d, metrics: Metrics, before: Callable[[], None] = None):
+        super().__init__(d, metrics, "", before)
@@ -0,0 +1,97 @@
+from huepy import *
+
+from . import tracing
+from .screens import ScreenType, classify, has_tab_bar
+from .snapshot import ScreenSnapshot
+from .versions import Selectors, latest
+from .waits import Waiter
+
+#: selectors of the screens the app shows once started, names of BurbnBot.versions
+_READY = ("tab_bar", "login_username", "dialog_title")
+
+
+class Navigator(object):
+    """Brings the app to a known screen reusing the running process: deep links
+    are sent to the warm app and the main tabs are reached with back presses.
+    The app is only stopped and cold-started when that recovery fails.
+
+    Args:
+        d (uiautomator2.Device): device
+        waiter (Waiter): used to wait for the app after (re)starting it
+        package (str): app package name
+        max_back (int): back presses tried before falling back to a cold restart
+        sel (Selectors): selectors of the app version, the newest if None
+    """
+
+    def __init__(self, d, waiter: Waiter, package: str = "com.instagram.android", max_back: int = 4,
+                 sel: Selectors = None):
+        self.d = d
+        self.sel = sel or latest()
+        self.waiter = waiter
+        self.package = package
+        self.max_back = max_back
+        self.warm: int = 0  #: times a screen was reached without restarting the app
+        self.cold: int = 0  #: cold restarts
+
+    def in_foreground(self) -> bool:
+        try:
+            return self.d.app_current().get("package") == self.package
+        except Exception:
+            return False
+
+    def start(self) -> ScreenSnapshot:
+        """Start the app and wait for its first screen, None if it didn't show up"""
+        self.d.app_start(package_name=self.package)
+        return self.waiter.any_element([getattr(self.sel, n) for n in _READY], timeout=20, label="app start")
+
+    def restart(self) -> ScreenSnapshot:
+        """Stop every app and cold-start Instagram, returns the first screen
+        or None if it didn't show up"""
+        print(good("Restarting app"))
+        self.cold += 1
+        with tracing.span("restart", "nav"):
+            self.d.app_stop_all()
+            return self.start()
+
+    def __back_to_tabs(self) -> ScreenSnapshot:
+        """Press back until the tab bar shows up, None if it doesn't"""
+        for i in range(self.max_back + 1):
+            s = ScreenSnapshot.from_device(self.d)
+            screen = classify(s, self.sel)
+            if screen in (ScreenType.LOGIN, ScreenType.LOGGED_OUT):
+                print(bad("You've Been Logged Out. Please log back in."))
+                return s
+            if has_tab_bar(s, self.sel) and screen not in (ScreenType.DIALOG, ScreenType.RATE_LIMITED):
+                return s
+            if screen == ScreenType.NONE:
+                break
+            if i < self.max_back:
+                self.d.press("back")
+        return None
+
+    def main_screen(self) -> ScreenSnapshot:
+        """Get to a screen showing the tab bar (home, search, activity or
+        profile), returns it
+
+        Returns:
+            ScreenSnapshot: the screen reached
+        """
+        with tracing.span("main screen", "nav") as span:
+            if not self.in_foreground():
+                self.start()
+            s = self.__back_to_tabs()
+            if s is not None:
+                self.warm += 1
+                return s
+            span.set(cold=True)
+            return self.restart() or ScreenSnapshot.from_device(self.d)
+
+    def open_url(self, url: str):
+        """Open an instagram.com link in the running app
+
+        Args:
+            url (str): link to open
+        """
+        # the wait for the screen that follows shows how long it took to render
+        with tracing.span("deep link", "nav", url=url):
+            self.d.shell("am start -a android.intent.action.VIEW -d {}".format(url))
@@ -0,0 +1,90 @@
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from .files import write_json
+
+
+class Profile(NamedTuple):
+    """Header of a profile as read the last time it was opened"""
+    username: str
+    posts: Optional[int]
+    followers: Optional[int]
+    following: Optional[int]
+    followed: Optional[bool]  #: True if you follow it, None for your own profile
+    has_posts: bool
+    time: float  #: when it was read, seconds since the epoch
+
+
+class ProfileCache(object):
+    """Profiles read recently, so a profile with no posts or already followed
+    can be skipped without opening it. Entries older than ``ttl`` are ignored
+    and the least recently used are dropped beyond ``size``.
+
+    Args:
+        path (str): JSON file the cache is kept in between runs, memory only if None
+        ttl (float): seconds an entry is valid
+        size (int): maximum number of profiles kept
+    """
+
+    def __init__(self, path: str = None, ttl: float = 24 * 60 * 60, size: int = 1000):
+        self.path = path
+        self.ttl = ttl
+        self.size = size
+        self.hits: int = 0
+        self.misses: int = 0
+        self.__entries: "OrderedDict[str, Profile]" = OrderedDict()
+        if path is not None and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for p in json.load(f):
+                    self.__entries[p["username"]] = Profile(**p)
+            self.__evict()
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def __evict(self):
+        limit = time.time() - self.ttl
+        for username in [u for u, p in self.__entries.items() if p.time < limit]:
+            del self.__entries[username]
+        while len(self.__entries) > self.size:
+            self.__entries.popitem(last=False)
+
+    def save(self):
+        """Write the cache to its file, replaced atomically"""
+        if self.path is None:
+            return
+        write_json(self.path, [p._asdict() for p in self.__entries.values()])
+
+    def get(self, username: str) -> Optional[Profile]:
+        """The cached profile, None if it isn't cached or has expired"""
+        p = self.__entries.get(username)
+        if p is not None and p.time < time.time() - self.ttl:
+            del self.__entries[username]
+            p = None
+        if p is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.__entries.move_to_end(username)
+        return p
+
+    def put(self, profile: Profile):
+        self.__entries[profile.username] = profile
+        self.__entries.move_to_end(profile.username)
+        self.__evict()
+        self.save()
+
+    def update(self, username: str, **fields):
+        """Change some fields of a cached profile, e.g. followed after a
+        follow, nothing happens if it isn't cached"""
+        p = self.__entries.get(username)
+        if p is not None:
+            self.__entries[username] = p._replace(**fields)
+            self.save()
+
+    def discard(self, username: str):
+        if self.__entries.pop(username, None) is not None:
+            self.save()
@@ -0,0 +1,484 @@
+"""Offline stand-in for ``uiautomator2.Device``.
+
+``ReplayDevice`` implements the part of the uiautomator2 API that
+``Burbnbot`` uses and answers it from recorded hierarchy XML (and
+screenshots) arranged as a screen graph: every click, swipe, key press,
+typed text or shell command can move the device to another recorded
+screen. Every call is kept in ``ReplayDevice.calls`` so a run can be
+measured or checked without a phone attached::
+
+    dev = ReplayDevice.load("scenarios/following")
+    bot = Burbnbot(device=dev)
+    bot.get_following_list()
+    print(dev.count("swipe"), dev.rpc_count)
+
+A scenario directory holds a ``scenario.json`` like::
+
+    {
+      "start": "home",
+      "version": "158.0.0.30.123",
+      "screens": {
+        "home": {"hierarchy": "home.xml", "screenshot": "home.png"},
+        "profile": {"hierarchy": "profile.xml"}
+      },
+      "transitions": [
+        {"from": "home", "click": {"resourceId": "com.instagram.android:id/profile_tab"}, "to": "profile"},
+        {"from": "following_1", "swipe": "up", "to": "following_2"},
+        {"shell": "instagram.com/explore/tags/", "to": "tag"},
+        {"from": "profile", "press": "back", "to": "home"},
+        {"from": "following", "send_keys": "bob", "to": "following_bob"}
+      ]
+    }
+
+Screens can be recorded from a real device with ``record_screen``.
+"""
+import json
+import os
+import re
+import xml.etree.ElementTree as ElementTree
+from typing import Callable, Dict, List, NamedTuple, Optional, Union
+
+import uiautomator2
+
+from .snapshot import Node, ScreenSnapshot
+
+EMPTY_HIERARCHY = '<?xml version="1.0" encoding="UTF-8"?><hierarchy rotation="0" />'
+
+
+class Call(NamedTuple):
+    """A single request sent to the device"""
+    kind: str
+    detail: tuple
+
+
+class ShellResponse(NamedTuple):
+    output: str
+    exit_code: int
+
+
+class Screen(object):
+    """A recorded screen state
+
+    Args:
+        name (str): unique name of the screen in the graph
+        hierarchy (str or callable): hierarchy XML, or a callable returning it
+            (for generated screens)
+        screenshot (bytes): image to return from ``screenshot()``
+    """
+
+    def __init__(self, name: str, hierarchy: Union[str, Callable[[], str]], screenshot: bytes = None):
+        self.name = name
+        self._hierarchy = hierarchy
+        self.screenshot = screenshot
+
+    @property
+    def hierarchy(self) -> str:
+        # generated screens are rebuilt on demand so large graphs stay small in memory
+        if callable(self._hierarchy):
+            return self._hierarchy()
+        return self._hierarchy
+
+
+class Transition(NamedTuple):
+    """Edge of the screen graph
+
+    ``source`` None matches every screen. ``arg`` depends on ``action``: a
+    selector dict for click/long_click/double_click, a direction (or None)
+    for swipe, a regex for shell and send_keys, a key name for press.
+    """
+    source: Optional[str]
+    action: str
+    arg: object
+    target: str
+
+    def accepts(self, screen: Optional[str], action: str, value) -> bool:
+        if self.action != action or (self.source is not None and self.source != screen):
+            return False
+        if action in ("click", "long_click", "double_click"):
+            return value is not None and any(n.matches(**self.arg) for n in [value] + list(value.ancestors()))
+        if action in ("shell", "send_keys"):
+            return re.search(self.arg, value) is not None
+        return self.arg is None or self.arg == value
+
+
+class ReplayObject(object):
+    """Lazy selector on a ``ReplayDevice``, mirrors ``uiautomator2.UiObject``"""
+
+    def __init__(self, device: "ReplayDevice", selector: dict, parent: "ReplayObject" = None, index: int = None):
+        self.device = device
+        self.selector = selector
+        self.parent = parent
+        self.index = index
+
+    def _nodes(self) -> List[Node]:
+        s = self.device.snapshot
+        selector = dict(self.selector)
+        if self.parent is None:
+            found = s.find(**selector)
+        else:
+            parents = self.parent._nodes()
+            found = s.children(parents[0], **selector) if parents else []
+        if self.index is not None:
+            try:
+                return [found[self.index]]
+            except IndexError:
+                return []
+        return found
+
+    def _node(self) -> Node:
+        nodes = self._nodes()
+        if not nodes:
+            raise uiautomator2.exceptions.UiObjectNotFoundError({"code": -32002, "message": str(self.selector)})
+        return nodes[0]
+
+    @property
+    def exists(self) -> bool:
+        self.device._record("exists", self.selector)
+        return len(self._nodes()) > 0
+
+    @property
+    def count(self) -> int:
+        self.device._record("count", self.selector)
+        return len(self._nodes())
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def info(self) -> dict:
+        self.device._record("info", self.selector)
+        n = self._node()
+        b = {"left": n.bounds.left, "top": n.bounds.top, "right": n.bounds.right, "bottom": n.bounds.bottom}
+        return {"text": n.text, "contentDescription": n.description, "resourceName": n.resource_id,
+                "className": n.class_name, "bounds": b, "visibleBounds": dict(b), "selected": n.selected,
+                "checked": n.checked, "clickable": n.clickable}
+
+    def get_text(self, timeout=None) -> str:
+        self.device._record("get_text", self.selector)
+        return self._node().text
+
+    def center(self) -> tuple:
+        self.device._record("info", self.selector)
+        return self._node().center()
+
+    def wait(self, exists=True, timeout=None) -> bool:
+        return self.exists == exists
+
+    def click(self, timeout=None, offset=None):
+        self.device._record("selector_click", self.selector)
+        self.device._act("click", self._node())
+
+    def long_click(self, duration: float = 0.5, timeout=None):
+        self.device._record("selector_long_click", self.selector)
+        self.device._act("long_click", self._node())
+
+    def send_keys(self, text: str):
+        self.device._record("selector_send_keys", self.selector, text)
+        self._node()
+        self.device._act("send_keys", text)
+
+    set_text = send_keys
+
+    def clear_text(self, timeout=None):
+        self.device._record("clear_text", self.selector)
+        self._node()
+
+    def swipe(self, direction: str, steps: int = 10):
+        self.device._record("swipe", (self.selector, direction))
+        self._node()
+        self.device._act("swipe", direction)
+
+    def child(self, **selector) -> "ReplayObject":
+        return ReplayObject(self.device, selector, parent=self)
+
+    def __getitem__(self, index: int) -> "ReplayObject":
+        return ReplayObject(self.device, self.selector, parent=self.parent, index=index)
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self[i]
+
+
+class ReplayXPath(object):
+    """Minimal ``d.xpath(...)`` support backed by ElementTree"""
+
+    def __init__(self, device: "ReplayDevice", expr: str):
+        self.device = device
+        self.expr = expr
+
+    def __repr__(self):
+        return "ReplayXPath({!r})".format(self.expr)
+
+    def _nodes(self) -> List[Node]:
+        if self.device.current is None:
+            return []
+        s = self.device.snapshot
+        root = ElementTree.Element("hierarchy")
+        owner: Dict[int, Node] = {}
+
+        def build(parent_el, node):
+            el = ElementTree.SubElement(parent_el, node.class_name or "node", {
+                "resource-id": node.resource_id, "text": node.text, "content-desc": node.description,
+                "class": node.class_name})
+            owner[id(el)] = node
+            for c in node.children:
+                build(el, c)
+
+        for n in s.nodes:
+            if n.parent is None:
+                build(root, n)
+        return [owner[id(el)] for el in root.findall("." + self.expr)]
+
+    @property
+    def exists(self) -> bool:
+        self.device._record("xpath_exists", self.expr)
+        return len(self._nodes()) > 0
+
+    def get_text(self) -> str:
+        self.device._record("xpath_get_text", self.expr)
+        nodes = self._nodes()
+        if not nodes:
+            raise uiautomator2.exceptions.XPathElementNotFoundError(self.expr)
+        return nodes[0].text
+
+    def click(self, timeout=None):
+        self.device._record("xpath_click", self.expr)
+        nodes = self._nodes()
+        if not nodes:
+            raise uiautomator2.exceptions.XPathElementNotFoundError(self.expr)
+        self.device._act("click", nodes[0])
+
+
+class ReplayDevice(object):
+    """Scripted screen graph that can be passed to ``Burbnbot(device=...)``
+
+    Args:
+        start (str): screen shown when the app starts
+        package (str): package name reported as installed
+        version (str): versionName reported by ``app_info``
+        serial (str): fake device serial
+    """
+
+    def __init__(self, start: str = None, package: str = "com.instagram.android",
+                 version: str = "158.0.0.30.123", serial: str = "replay"):
+        self.start = start
+        self.package = package
+        self.version = version
+        self.serial = serial
+        self.screens: Dict[str, Screen] = {}
+        self.transitions: List[Transition] = []
+        self._by_source: Dict[Optional[str], List[Transition]] = {}
+        self.calls: List[Call] = []
+        self.current: Optional[Screen] = None
+        self.history: List[str] = []
+        self._snapshot: Optional[ScreenSnapshot] = None
+
+    @classmethod
+    def load(cls, path: str) -> "ReplayDevice":
+        """Load a scenario directory (or a scenario JSON file)
+
+        Args:
+            path (str): directory containing scenario.json, or the json itself
+        """
+        if os.path.isdir(path):
+            path = os.path.join(path, "scenario.json")
+        base = os.path.dirname(path)
+        with open(path) as f:
+            sc = json.load(f)
+        dev = cls(start=sc.get("start"), package=sc.get("package", "com.instagram.android"),
+                  version=sc.get("version", "158.0.0.30.123"), serial=sc.get("serial", "replay"))
+        for name, s in sc["screens"].items():
+            with open(os.path.join(base, s["hierarchy"]), encoding="utf-8") as f:
+                xml = f.read()
+            shot = None
+            if s.get("screenshot"):
+                with open(os.path.join(base, s["screenshot"]), "rb") as f:
+                    shot = f.read()
+            dev.add_screen(name, xml, shot)
+        for t in sc.get("transitions", []):
+            for action in ("click", "long_click", "double_click", "swipe", "shell", "press", "send_keys"):
+                if action in t:
+                    dev.add_transition(t.get("from"), action, t[action], t["to"])
+        return dev
+
+    def add_screen(self, name: str, hierarchy: Union[str, Callable[[], str]], screenshot: bytes = None) -> Screen:
+        screen = Screen(name, hierarchy, screenshot)
+        self.screens[name] = screen
+        if self.start is None:
+            self.start = name
+        return screen
+
+    def add_transition(self, source: Optional[str], action: str, arg, target: str):
+        """
+        Args:
+            source (str): screen the transition starts from, None for any screen
+            action (str): click, long_click, double_click, swipe, shell, press or send_keys
+            arg: selector, direction, regex or key depending on the action
+            target (str): screen reached
+        """
+        t = Transition(source, action, arg, target)
+        self.transitions.append(t)
+        self._by_source.setdefault(source, []).append(t)
+
+    def goto(self, name: Optional[str]):
+        self.current = None if name is None else self.screens[name]
+        self._snapshot = None
+        self.history.append(name)
+
+    @property
+    def snapshot(self) -> ScreenSnapshot:
+        """Parsed current screen, the ground truth used to answer queries"""
+        if self._snapshot is None:
+            self._snapshot = ScreenSnapshot(self.current.hierarchy if self.current else EMPTY_HIERARCHY)
+        return self._snapshot
+
+    # bookkeeping
+
+    def _record(self, kind: str, *detail):
+        self.calls.append(Call(kind, detail))
+
+    def _act(self, action: str, value):
+        name = self.current.name if self.current else None
+        for t in self._by_source.get(name, []) + self._by_source.get(None, []):
+            if t.accepts(name, action, value):
+                self.goto(t.target)
+                return True
+        return False
+
+    def count(self, *kinds: str) -> int:
+        """Number of recorded calls of the given kinds"""
+        return sum(1 for c in self.calls if c.kind in kinds)
+
+    @property
+    def rpc_count(self) -> int:
+        return len(self.calls)
+
+    def reset_calls(self):
+        self.calls = []
+
+    # uiautomator2.Device API
+
+    def __call__(self, **selector) -> ReplayObject:
+        return ReplayObject(self, selector)
+
+    def xpath(self, expr: str) -> ReplayXPath:
+        return ReplayXPath(self, expr)
+
+    @property
+    def info(self) -> dict:
+        self._record("info")
+        return {"displayWidth": 1080, "displayHeight": 1920, "currentPackageName":
+                self.package if self.current else "com.android.launcher3", "sdkInt": 28}
+
+    def window_size(self) -> tuple:
+        return 1080, 1920
+
+    def dump_hierarchy(self, compressed=False, pretty=False, max_depth=None) -> str:
+        self._record("dump_hierarchy")
+        return self.current.hierarchy if self.current else EMPTY_HIERARCHY
+
+    def screenshot(self, filename: str = None, format="pillow"):
+        self._record("screenshot", filename)
+        data = self.current.screenshot if self.current else None
+        if filename is not None and data is not None:
+            with open(filename, "wb") as f:
+                f.write(data)
+        return data
+
+    def click(self, x: float, y: float):
+        self._record("click", x, y)
+        if self.current is not None:
+            self._act("click", self.snapshot.node_at(x, y))
+
+    def double_click(self, x: float, y: float, duration=0.1):
+        self._record("double_click", x, y)
+        if self.current is not None:
+            self._act("double_click", self.snapshot.node_at(x, y))
+
+    def long_click(self, x: float, y: float, duration: float = 0.5):
+        self._record("long_click", x, y)
+        if self.current is not None:
+            self._act("long_click", self.snapshot.node_at(x, y))
+
+    def swipe(self, fx: float, fy: float, tx: float, ty: float, duration: float = None, steps: int = None):
+        self._record("swipe", fx, fy, tx, ty)
+        if abs(ty - fy) >= abs(tx - fx):
+            direction = "up" if ty < fy else "down"
+        else:
+            direction = "left" if tx < fx else "right"
+        if not self._act("swipe", direction):
+            self._act("swipe", None)
+
+    def swipe_ext(self, direction: str, scale: float = 0.9, box=None):
+        self._record("swipe", direction)
+        if not self._act("swipe", direction):
+            self._act("swipe", None)
+
+    def press(self, key: str):
+        self._record("press", key)
+        self._act("press", key)
+
+    def send_keys(self, text: str, clear: bool = False):
+        self._record("send_keys", text)
+        self._act("send_keys", text)
+
+    def clear_text(self):
+        self._record("clear_text")
+
+    def shell(self, cmdargs, timeout=60) -> ShellResponse:
+        cmd = cmdargs if isinstance(cmdargs, str) else " ".join(cmdargs)
+        self._record("shell", cmd)
+        self._act("shell", cmd)
+        return ShellResponse("", 0)
+
+    def app_list(self, filter: str = None) -> list:
+        self._record("app_list", filter)
+        return [self.package] if filter is None or filter == self.package else []
+
+    def app_info(self, package_name: str) -> dict:
+        self._record("app_info", package_name)
+        if package_name != self.package:
+            raise uiautomator2.exceptions.AppNotFoundError(package_name)
+        return {"packageName": self.package, "versionName": self.version}
+
+    def app_current(self) -> dict:
+        self._record("app_current")
+        if self.current is None:
+            return {"package": "com.android.launcher3", "activity": ".Launcher"}
+        return {"package": self.package, "activity": self.current.name}
+
+    def app_start(self, package_name: str, activity: str = None, wait: bool = False, stop: bool = False):
+        self._record("app_start", package_name)
+        if package_name == self.package and (stop or self.current is None):
+            self.goto(self.start)
+
+    def app_stop(self, package_name: str):
+        self._record("app_stop", package_name)
+        if package_name == self.package:
+            self.goto(None)
+
+    def app_stop_all(self, excludes: list = None) -> list:
+        self._record("app_stop_all")
+        self.goto(None)
+        return [self.package]
+
+    def app_clear(self, package_name: str):
+        self._record("app_clear", package_name)
+        if package_name == self.package:
+            self.goto(None)
+
+
+def record_screen(d: uiautomator2.Device, directory: str, name: str) -> dict:
+    """Save the current screen of a real device as ``<name>.xml`` and
+    ``<name>.png``, returns the entry to put in ``scenario.json["screens"]``
+
+    Args:
+        d (uiautomator2.Device): connected device
+        directory (str): scenario directory
+        name (str): screen name
+    """
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, name + ".xml"), "w", encoding="utf-8") as f:
+        f.write(d.dump_hierarchy())
+    d.screenshot(os.path.join(directory, name + ".png"))
+    return {"hierarchy": name + ".xml", "screenshot": name + ".png"}
@@ -0,0 +1,64 @@
+import json
+import os
+from typing import Dict, Optional
+
+from .files import write_json
+
+
+class SavedCollections(object):
+    """Where each collection is in the save to collection picker, as the
+    number of swipes from its start, so a save jumps to the collection
+    instead of reading every page of the picker. Once the whole picker was
+    read a missing collection is known to be missing.
+
+    Args:
+        path (str): JSON file kept between runs, memory only if None
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self.positions: Dict[str, int] = {}
+        self.complete: bool = False  #: every collection is in positions
+        if path is not None and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.positions = data["positions"]
+            self.complete = data["complete"]
+
+    def save(self):
+        """Write the positions to the file, replaced atomically"""
+        if self.path is None:
+            return
+        write_json(self.path, {"positions": self.positions, "complete": self.complete})
+
+    def position(self, name: str) -> Optional[int]:
+        """Swipes needed to show the collection, None if unknown"""
+        return self.positions.get(name)
+
+    def absent(self, name: str) -> bool:
+        """True if the collection is known not to exist"""
+        return self.complete and name not in self.positions
+
+    def seen(self, name: str, swipes: int):
+        """A collection was on screen after swipes swipes"""
+        if self.positions.get(name) != swipes:
+            self.positions[name] = swipes
+            self.save()
+
+    def scanned(self):
+        """The picker was read to its end"""
+        if not self.complete:
+            self.complete = True
+            self.save()
+
+    def created(self, name: str):
+        """A collection was created, it is expected first in the picker, the
+        next save checks it"""
+        self.positions[name] = 0
+        self.save()
+
+    def forget(self):
+        """The picker changed, e.g. a collection was renamed on another device"""
+        self.positions = {}
+        self.complete = False
+        self.save()
@@ -0,0 +1,117 @@
+import functools
+from typing import NamedTuple, Optional, Tuple
+
+from .snapshot import ScreenSnapshot
+from .versions import Selectors, latest
+
+
+class ScreenType(object):
+    """Screens told apart by classify"""
+    NONE: str = "none"  #: nothing on screen, the app is not running
+    LOGIN: str = "login"  #: login form
+    LOGGED_OUT: str = "logged_out"  #: "You've Been Logged Out" dialog
+    RATE_LIMITED: str = "rate_limited"  #: "Try Again Later" dialog
+    DIALOG: str = "dialog"  #: any other dialog
+    CAMERA: str = "camera"  #: story/post camera
+    COLLECTIONS: str = "collections"  #: save to collection picker
+    SORT_OPTIONS: str = "sort_options"  #: sort sheet of the following list
+    HASHTAG_LIST: str = "hashtag_list"  #: hashtags you follow
+    FOLLOW_LIST: str = "follow_list"  #: following, followers and least interacted lists
+    PROFILE: str = "profile"  #: a profile header and grid
+    HASHTAG_GRID: str = "hashtag_grid"  #: top/recent grid of a hashtag or location
+    HOME_FEED: str = "home_feed"  #: the home feed
+    POST: str = "post"  #: a post, or a feed of posts opened from a grid
+    ACTIVITY: str = "activity"  #: notifications
+    PAGE: str = "page"  #: another titled screen without a feed
+    MAIN: str = "main"  #: another screen showing the tab bar
+    UNKNOWN: str = "unknown"
+
+
+class _Fingerprint(NamedTuple):
+    screen: str
+    all_ids: frozenset
+    any_ids: frozenset
+    no_ids: frozenset
+    texts: Tuple[Tuple[str, str], ...]
+
+
+class _Names(NamedTuple):
+    """A fingerprint by selector names, resolved against the selectors of a version"""
+    screen: str
+    all_ids: tuple = ()
+    any_ids: tuple = ()
+    no_ids: tuple = ()
+    texts: tuple = ()  #: (name, text) pairs
+
+    def resolve(self, sel: Selectors) -> _Fingerprint:
+        def ids(names: tuple) -> frozenset:
+            return frozenset(getattr(sel, n).resource_id for n in names)
+
+        return _Fingerprint(self.screen, ids(self.all_ids), ids(self.any_ids), ids(self.no_ids),
+                            tuple((getattr(sel, n).resource_id, v) for n, v in self.texts))
+
+
+#: checked in order, the first match wins, by names of BurbnBot.versions
+FINGERPRINTS = (
+    _Names(ScreenType.LOGIN, any_ids=("login_username",)),
+    _Names(ScreenType.LOGGED_OUT, texts=(("dialog_title", "You've Been Logged Out"),)),
+    _Names(ScreenType.RATE_LIMITED, texts=(("dialog_title", "Try Again Later"),)),
+    _Names(ScreenType.DIALOG, any_ids=("dialog_title", "dialog_body")),
+    _Names(ScreenType.CAMERA, any_ids=("camera",)),
+    _Names(ScreenType.COLLECTIONS, any_ids=("collection_name", "new_collection")),
+    _Names(ScreenType.SORT_OPTIONS, any_ids=("sort_option",)),
+    _Names(ScreenType.HASHTAG_LIST, texts=(("title", "Hashtags"),)),
+    _Names(ScreenType.FOLLOW_LIST, any_ids=("list_row", "list_username")),
+    _Names(ScreenType.PROFILE, any_ids=("profile_avatar", "following_container", "profile_follow_button")),
+    _Names(ScreenType.HASHTAG_GRID, any_ids=("hashtag_media_count",)),
+    _Names(ScreenType.HOME_FEED, all_ids=("tab_bar", "feed_container"), no_ids=("title", "page_title")),
+    _Names(ScreenType.POST, any_ids=("like_button", "post_author")),
+    _Names(ScreenType.ACTIVITY, all_ids=("notification_row",)),
+    _Names(ScreenType.PAGE, all_ids=("page_title",), no_ids=("feed_container",)),
+    _Names(ScreenType.MAIN, all_ids=("tab_bar",)),
+)
+
+
+@functools.lru_cache(maxsize=8)
+def _fingerprints(sel: Selectors) -> Tuple[_Fingerprint, ...]:
+    return tuple(fp.resolve(sel) for fp in FINGERPRINTS)
+
+
+#: screens where like_n_swipe ended up after a wrong click
+WRONG_PLACE = frozenset((ScreenType.PROFILE, ScreenType.CAMERA, ScreenType.PAGE, ScreenType.FOLLOW_LIST,
+                         ScreenType.HASHTAG_LIST, ScreenType.ACTIVITY))
+
+
+def _matches(fp: _Fingerprint, s: ScreenSnapshot, ids) -> bool:
+    if not fp.all_ids <= ids:
+        return False
+    if fp.any_ids and fp.any_ids.isdisjoint(ids):
+        return False
+    if not fp.no_ids.isdisjoint(ids):
+        return False
+    return all(s.get_text(resourceId=k) == v for k, v in fp.texts)
+
+
+def classify(s: ScreenSnapshot, sel: Selectors = None) -> str:
+    """Label a screen from a single hierarchy dump, see ScreenType
+
+    Args:
+        s (ScreenSnapshot): screen to classify
+        sel (Selectors): selectors of the app version, the newest if None
+    """
+    if not s.nodes:
+        return ScreenType.NONE
+    ids = s.resource_ids
+    for fp in _fingerprints(sel or latest()):
+        if _matches(fp, s, ids):
+            return fp.screen
+    return ScreenType.UNKNOWN
+
+
+def has_tab_bar(s: ScreenSnapshot, sel: Selectors = None) -> bool:
+    return (sel or latest()).tab_bar.resource_id in s.resource_ids
+
+
+def title(s: ScreenSnapshot, sel: Selectors = None) -> Optional[str]:
+    """Text of the action bar title, None if there is none"""
+    return (sel or latest()).title.get_text(s)
@@ -0,0 +1,129 @@
+from typing import Callable, Dict, Iterator, List, NamedTuple
+
+from . import tracing
+from .snapshot import Node, ScreenSnapshot
+
+
+class Page(NamedTuple):
+    """A screen of a scrolling list"""
+    snapshot: ScreenSnapshot
+    rows: List[str]  #: keys of every visible row, in screen order
+    new: List[str]  #: rows that were not on the previous page
+    end: bool = False  #: last page, ``end`` was true for it
+    stalled: bool = False  #: last page, ``patience`` pages in a row brought no new row
+
+
+class ScrollStats(object):
+    """Counters of the lists scrolled under one label"""
+
+    def __init__(self):
+        self.pages: int = 0
+        self.swipes: int = 0
+        self.rows: int = 0  #: rows that showed up after a swipe or on the first page
+        self.stalls: int = 0  #: pages that brought no new row
+
+    @property
+    def rows_per_swipe(self) -> float:
+        return self.rows / self.swipes if self.swipes else 0.0
+
+    def as_dict(self) -> dict:
+        return {"pages": self.pages, "swipes": self.swipes, "rows": self.rows, "stalls": self.stalls,
+                "rows_per_swipe": round(self.rows_per_swipe, 2)}
+
+
+class Scroller(object):
+    """Scrolls lists computing each swipe from a single snapshot, and tells the
+    end of a list by the rows it shows instead of by a footer text only
+
+    Args:
+        d (uiautomator2.Device): device
+        patience (int): pages in a row without new rows before giving up
+        distance (float): fraction of the visible rows each swipe moves, lower
+            it if rows are skipped, raise it to read more rows per swipe
+    """
+
+    def __init__(self, d, patience: int = 3, distance: float = 1.0):
+        self.d = d
+        self.patience = patience
+        self.distance = distance
+        self.stats: Dict[str, ScrollStats] = {}
+
+    def swipe_node_up(self, node: Node):
+        """Swipe up inside the bounds of a node, like ``UiObject.swipe("up")``
+
+        Args:
+            node (Node): Element
+        """
+        b = node.bounds
+        x = (b.left + b.right) / 2
+        self.d.swipe(x, b.bottom - (b.bottom - b.top) / 10, x, b.top + (b.bottom - b.top) / 10, duration=0)
+
+    def swipe(self, rows: List[Node]) -> bool:
+        """Drag the last row to where the first one ends, returns False if
+        there were not enough rows to swipe
+
+        Args:
+            rows (list): nodes of the same snapshot, as returned by ScreenSnapshot.find
+        """
+        if len(rows) < 2:
+            return False
+        fx = rows[-1].bounds.right / 2
+        fy = rows[-1].bounds.top
+        ty = fy - (fy - rows[0].bounds.bottom) * self.distance
+        if fy == ty:
+            self.swipe_node_up(rows[-1])
+        else:
+            self.d.swipe(fx, fy, fx, ty, duration=0)
+        return True
+
+    def pages(self, read: Callable[[ScreenSnapshot], List[str]], rows: dict, end: Callable[[ScreenSnapshot], bool] = None,
+              action: Callable[[ScreenSnapshot], bool] = None, label: str = "",
+              first: ScreenSnapshot = None) -> Iterator[Page]:
+        """Yield every page of the list on screen, swiping between them
+
+        The list ends when ``end`` is true for a page or after ``patience``
+        pages in a row without a row that wasn't on the page before, so a list
+        whose footer never shows up doesn't scroll forever. The last page
+        tells which one happened, see Page.end and Page.stalled.
+
+        Args:
+            read (callable): keys of the rows of a snapshot, e.g. usernames
+            rows (dict): selector of the row nodes the swipe is computed from
+            end (callable): True for the last page of the list
+            action (callable): called instead of the swipe, returns True if it
+                handled the page (e.g. tapped a Retry button)
+            label (str): name of the list in stats
+            first (ScreenSnapshot): current screen if already dumped
+        """
+        st = self.stats.setdefault(label, ScrollStats())
+        previous = set()
+        stalled = 0
+        s = first
+        while True:
+            if s is None:
+                s = ScreenSnapshot.from_device(self.d)
+            keys = read(s)
+            new = [k for k in dict.fromkeys(keys) if k not in previous]
+            st.pages += 1
+            st.rows += len(new)
+            done = end is not None and end(s)
+            if done or new:
+                stalled = 0
+            else:
+                stalled += 1
+                st.stalls += 1
+                tracing.instant("stall", "scroll", label=label, stalled=stalled)
+            gave_up = stalled >= self.patience
+            yield Page(s, keys, new, done, gave_up)
+            if done or gave_up:
+                return
+            previous = set(keys)
+
+            with tracing.span("page {}".format(label), "scroll", page=st.pages, new=len(new)):
+                if not (action is not None and action(s)) and self.swipe(s.find(**rows)):
+                    st.swipes += 1
+            s = None
+
+    def report(self) -> Dict[str, dict]:
+        """Pages, swipes, rows and rows per swipe of every list scrolled"""
+        return {label: st.as_dict() for label, st in self.stats.items()}
@@ -0,0 +1,60 @@
+import json
+import os
+import time
+from typing import Dict, NamedTuple, Optional
+
+from .files import write_json
+
+
+class DeviceCheck(NamedTuple):
+    """Startup checks of a device, see Burbnbot.ensure_ready"""
+    serial: str
+    version: str  #: versionName of the installed Instagram
+    logged_in: bool  #: True if an account was found logged in
+    time: float  #: when the checks were made, seconds since the epoch
+
+
+class SessionCache(object):
+    """Startup checks of each device, so a bot created again on the same
+    device skips them while they are recent
+
+    Args:
+        path (str): JSON file kept between runs, e.g. by short cron jobs,
+            memory only if None
+        ttl (float): seconds the checks are trusted
+    """
+
+    def __init__(self, path: str = None, ttl: float = 3600.0):
+        self.path = path
+        self.ttl = ttl
+        self.checks: Dict[str, DeviceCheck] = {}
+        if path is not None and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.checks = {k: DeviceCheck(**v) for k, v in json.load(f).items()}
+
+    def save(self):
+        """Write the checks to the file, replaced atomically"""
+        if self.path is None:
+            return
+        write_json(self.path, {k: c._asdict() for k, c in self.checks.items()})
+
+    def get(self, serial: str) -> Optional[DeviceCheck]:
+        """Checks of the device, None if unknown or older than ttl"""
+        c = self.checks.get(serial)
+        if c is None or time.time() - c.time > self.ttl:
+            return None
+        return c
+
+    def put(self, serial: str, version: str, logged_in: bool) -> DeviceCheck:
+        c = self.checks[serial] = DeviceCheck(serial, version, logged_in, time.time())
+        self.save()
+        return c
+
+    def forget(self, serial: str):
+        """The device changed, e.g. the account was logged out"""
+        if self.checks.pop(serial, None) is not None:
+            self.save()
+
+
+#: shared by the bots of a process that are not given a cache
+SESSIONS = SessionCache()
@@ -0,0 +1,207 @@
+import re
+import xml.etree.ElementTree as ElementTree
+from typing import Callable, Dict, Iterator, KeysView, List, NamedTuple, Optional
+
+_BOUNDS_RE = re.compile(r"\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]")
+
+
+class Bounds(NamedTuple):
+    """Visible bounds of a node, in screen pixels"""
+    left: int
+    top: int
+    right: int
+    bottom: int
+
+    def center(self) -> tuple:
+        return (self.left + self.right) // 2, (self.top + self.bottom) // 2
+
+    def contains(self, x: float, y: float) -> bool:
+        return self.left <= x <= self.right and self.top <= y <= self.bottom
+
+
+class Node(object):
+    """A single element of a hierarchy dump"""
+    __slots__ = ("resource_id", "text", "description", "class_name", "bounds", "selected", "checked", "clickable",
+                 "parent", "children", "depth")
+
+    def __init__(self, attrib: dict, parent: "Node" = None):
+        self.resource_id: str = attrib.get("resource-id", "")
+        self.text: str = attrib.get("text", "")
+        self.description: str = attrib.get("content-desc", "")
+        self.class_name: str = attrib.get("class", "")
+        self.selected: bool = attrib.get("selected") == "true"
+        self.checked: bool = attrib.get("checked") == "true"
+        self.clickable: bool = attrib.get("clickable") == "true"
+        m = _BOUNDS_RE.match(attrib.get("bounds", ""))
+        self.bounds: Bounds = Bounds(*map(int, m.groups())) if m else Bounds(0, 0, 0, 0)
+        self.parent: Optional[Node] = parent
+        self.children: List[Node] = []
+        self.depth: int = 0 if parent is None else parent.depth + 1
+
+    def center(self) -> tuple:
+        return self.bounds.center()
+
+    def matches(self, **selector) -> bool:
+        """True if this node satisfies every key of a uiautomator2-style selector"""
+        return _compile(selector)(self)
+
+    def ancestors(self) -> Iterator["Node"]:
+        n = self.parent
+        while n is not None:
+            yield n
+            n = n.parent
+
+    def descendants(self) -> Iterator["Node"]:
+        for c in self.children:
+            yield c
+            yield from c.descendants()
+
+    def __repr__(self):
+        return "<Node {} text={!r} desc={!r} {}>".format(self.resource_id or self.class_name, self.text,
+                                                       self.description, tuple(self.bounds))
+
+
+def compile_check(key: str, value) -> Callable[[Node], bool]:
+    """Test of a node for one keyword of a uiautomator2-style selector
+
+    Args:
+        key (str): keyword, e.g. resourceId or textContains
+        value: its value
+    """
+    if key == "resourceId":
+        return lambda n: n.resource_id == value
+    if key == "text":
+        return lambda n: n.text == value
+    if key == "description":
+        return lambda n: n.description == value
+    if key == "className":
+        return lambda n: n.class_name == value
+    if key == "textContains":
+        return lambda n: value in n.text
+    if key == "textStartsWith":
+        return lambda n: n.text.startswith(value)
+    if key == "descriptionContains":
+        return lambda n: value in n.description
+    if key == "descriptionStartsWith":
+        return lambda n: n.description.startswith(value)
+    if key == "selected":
+        return lambda n: n.selected == value
+    if key == "checked":
+        return lambda n: n.checked == value
+    raise TypeError("Unsupported selector: {}".format(key))
+
+
+def _compile(selector: dict) -> Callable[[Node], bool]:
+    checks = [compile_check(k, v) for k, v in selector.items()]
+    return lambda n: all(c(n) for c in checks)
+
+
+class ScreenSnapshot(object):
+    """One ``dump_hierarchy()`` parsed and indexed, so repeated selector
+    queries on the same screen state are answered locally instead of being
+    sent to the device one JSON-RPC at a time.
+
+    Selectors use the same keyword names as ``uiautomator2.Device.__call__``
+    (resourceId, text, description, className, instance, ...).
+
+    Args:
+        xml (str): hierarchy XML as returned by ``Device.dump_hierarchy()``
+    """
+
+    def __init__(self, xml: str):
+        self.xml: str = xml
+        self.nodes: List[Node] = []
+        self._by_id: Dict[str, List[Node]] = {}
+        self._by_text: Dict[str, List[Node]] = {}
+        self._by_desc: Dict[str, List[Node]] = {}
+        self._by_class: Dict[str, List[Node]] = {}
+        root = ElementTree.fromstring(xml)
+        for child in root:
+            self.__add(child, None)
+
+    @classmethod
+    def from_device(cls, d) -> "ScreenSnapshot":
+        """
+        Args:
+            d (uiautomator2.Device): device to dump
+        """
+        return cls(d.dump_hierarchy())
+
+    def __add(self, element: ElementTree.Element, parent: Optional[Node]):
+        node = Node(element.attrib, parent)
+        if parent is not None:
+            parent.children.append(node)
+        self.nodes.append(node)
+        for key, index in ((node.resource_id, self._by_id), (node.text, self._by_text),
+                           (node.description, self._by_desc), (node.class_name, self._by_class)):
+            if key:
+                index.setdefault(key, []).append(node)
+        for child in element:
+            self.__add(child, node)
+
+    def __candidates(self, selector: dict) -> List[Node]:
+        pools = []
+        if "resourceId" in selector:
+            pools.append(self._by_id.get(selector["resourceId"], []))
+        if "text" in selector:
+            pools.append(self._by_text.get(selector["text"], []))
+        if "description" in selector:
+            pools.append(self._by_desc.get(selector["description"], []))
+        if "className" in selector:
+            pools.append(self._by_class.get(selector["className"], []))
+        if not pools:
+            return self.nodes
+        return min(pools, key=len)
+
+    @property
+    def resource_ids(self) -> KeysView:
+        """Every resource-id present on the screen"""
+        return self._by_id.keys()
+
+    def find(self, **selector) -> List[Node]:
+        """Return every node matching the selector, in document order"""
+        instance = selector.pop("instance", None)
+        match = _compile(selector)
+        found = [n for n in self.__candidates(selector) if match(n)]
+        if instance is not None:
+            return found[instance:instance + 1]
+        return found
+
+    def first(self, **selector) -> Optional[Node]:
+        found = self.find(**selector)
+        return found[0] if found else None
+
+    def exists(self, **selector) -> bool:
+        return self.first(**selector) is not None
+
+    def count(self, **selector) -> int:
+        return len(self.find(**selector))
+
+    def get_text(self, **selector) -> Optional[str]:
+        """Text of the first matching node, None if there is no match"""
+        node = self.first(**selector)
+        return None if node is None else node.text
+
+    def texts(self, **selector) -> List[str]:
+        return [n.text for n in self.find(**selector)]
+
+    def bounds(self, **selector) -> Optional[Bounds]:
+        node = self.first(**selector)
+        return None if node is None else node.bounds
+
+    def children(self, parent: Node, **selector) -> List[Node]:
+        """Descendants of parent matching the selector, like ``UiObject.child``"""
+        instance = selector.pop("instance", None)
+        match = _compile(selector)
+        found = [n for n in parent.descendants() if match(n)]
+        if instance is not None:
+            return found[instance:instance + 1]
+        return found
+
+    def node_at(self, x: float, y: float) -> Optional[Node]:
+        """Deepest node whose bounds contain the point"""
+        hit = None
+        for n in self.nodes:
+            if n.bounds.contains(x, y) and (hit is None or n.depth >= hit.depth):
+                hit = n
+        return hit
@@ -0,0 +1,153 @@
+import datetime
+import sqlite3
+from typing import Iterable, List, Optional
+
+FOLLOWING = "following"
+FOLLOWERS = "followers"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS relationships (
+    kind TEXT NOT NULL,
+    username TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    active INTEGER NOT NULL DEFAULT 1,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    PRIMARY KEY (kind, username)
+);
+CREATE TABLE IF NOT EXISTS syncs (
+    kind TEXT PRIMARY KEY,
+    started TEXT NOT NULL,
+    updated TEXT NOT NULL,
+    complete INTEGER NOT NULL DEFAULT 0,
+    last_complete TEXT
+);
+CREATE TABLE IF NOT EXISTS checkpoint_rows (
+    kind TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    username TEXT NOT NULL,
+    PRIMARY KEY (kind, username)
+);
+"""
+
+
+def _now() -> str:
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+
+class Scrape(object):
+    """A following/followers scrape in progress, every ``add`` is committed so
+    an interrupted scrape can be resumed by ``RelationshipStore.begin``
+
+    Args:
+        store (RelationshipStore): owner store
+        kind (str): FOLLOWING or FOLLOWERS
+        seen (list): usernames already scraped by a previous, interrupted run
+    """
+
+    def __init__(self, store: "RelationshipStore", kind: str, seen: List[str]):
+        self.store = store
+        self.kind = kind
+        self.seen = dict.fromkeys(seen)
+        self.resumed = len(seen) > 0
+
+    def add(self, usernames: Iterable[str]) -> List[str]:
+        """Checkpoint the usernames of a page, returns the ones not seen before"""
+        new = [u for u in dict.fromkeys(usernames) if u not in self.seen]
+        if new:
+            start = len(self.seen)
+            self.seen.update(dict.fromkeys(new))
+            self.store.db.executemany("INSERT OR IGNORE INTO checkpoint_rows (kind, seq, username) VALUES (?, ?, ?)",
+                                      [(self.kind, start + i, u) for i, u in enumerate(new)])
+        self.store.db.execute("UPDATE syncs SET updated = ? WHERE kind = ?", (_now(), self.kind))
+        self.store.db.commit()
+        return new
+
+    @property
+    def usernames(self) -> List[str]:
+        return list(self.seen)
+
+
+class RelationshipStore(object):
+    """SQLite-backed copy of the following and followers lists
+
+    Args:
+        path (str): database file, created if it doesn't exist
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript(_SCHEMA)
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def begin(self, kind: str, resume: bool = True) -> Scrape:
+        """Start a scrape, or continue the unfinished one of the same kind
+
+        Args:
+            kind (str): FOLLOWING or FOLLOWERS
+            resume (bool): if False an unfinished scrape is discarded
+        """
+        row = self.db.execute("SELECT complete FROM syncs WHERE kind = ?", (kind,)).fetchone()
+        seen = []
+        if row is not None and row[0] == 0 and resume:
+            seen = [r[0] for r in self.db.execute(
+                "SELECT username FROM checkpoint_rows WHERE kind = ? ORDER BY seq", (kind,))]
+        else:
+            self.db.execute("DELETE FROM checkpoint_rows WHERE kind = ?", (kind,))
+            self.db.execute("INSERT INTO syncs (kind, started, updated, complete) VALUES (?, ?, ?, 0) "
+                            "ON CONFLICT(kind) DO UPDATE SET started = excluded.started, "
+                            "updated = excluded.updated, complete = 0", (kind, _now(), _now()))
+        self.db.commit()
+        return Scrape(self, kind, seen)
+
+    def finish(self, scrape: Scrape, full: bool = True) -> List[str]:
+        """Merge a finished scrape into the stored list and return the list
+
+        Args:
+            scrape (Scrape): scrape returned by begin
+            full (bool): True if the whole list was read, users not seen are
+                then marked as gone. False for an incremental sync that
+                stopped at the first page of known users, the new users are
+                put at the top of the list.
+        """
+        now = _now()
+        kind = scrape.kind
+        names = scrape.usernames
+        if full:
+            self.db.execute("UPDATE relationships SET active = 0 WHERE kind = ?", (kind,))
+            order = names
+        else:
+            stored = self.usernames(kind)
+            known = set(stored)
+            order = [u for u in names if u not in known]
+            new = set(order)
+            order += [u for u in stored if u not in new]
+        self.db.executemany(
+            "INSERT INTO relationships (kind, username, position, active, first_seen, last_seen) "
+            "VALUES (?, ?, ?, 1, ?, ?) ON CONFLICT(kind, username) DO UPDATE SET position = excluded.position, "
+            "active = 1, last_seen = CASE WHEN ? THEN excluded.last_seen ELSE last_seen END",
+            [(kind, u, i, now, now, u in scrape.seen) for i, u in enumerate(order)])
+        self.db.execute("DELETE FROM checkpoint_rows WHERE kind = ?", (kind,))
+        self.db.execute("UPDATE syncs SET complete = 1, updated = ?, last_complete = ? WHERE kind = ?",
+                        (now, now, kind))
+        self.db.commit()
+        return self.usernames(kind)
+
+    def usernames(self, kind: str) -> List[str]:
+        """Stored list, in the order it was shown by the app"""
+        return [r[0] for r in self.db.execute(
+            "SELECT username FROM relationships WHERE kind = ? AND active = 1 ORDER BY position", (kind,))]
+
+    def in_progress(self, kind: str) -> bool:
+        """True if a scrape was started and not finished"""
+        row = self.db.execute("SELECT complete FROM syncs WHERE kind = ?", (kind,)).fetchone()
+        return row is not None and row[0] == 0
+
+    def last_sync(self, kind: str) -> Optional[str]:
+        """Date of the last complete scrape, None if there was none"""
+        row = self.db.execute("SELECT last_complete FROM syncs WHERE kind = ?", (kind,)).fetchone()
+        return None if row is None else row[0]
@@ -0,0 +1,123 @@
+"""Timeline of a run in the Chrome trace-event format.
+
+Public methods, navigation steps, waits, scroll pages and device calls are
+written as nested spans, open the file in chrome://tracing or
+https://ui.perfetto.dev. Nothing is recorded unless ``start`` was called,
+``span`` then returns a shared no-op object::
+
+    python example.py -d emulator-5554 --trace run.trace.json
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from typing import Optional
+
+
+class Tracer(object):
+    """Collects complete ("X") events and writes them to a trace file
+
+    Args:
+        path (str): trace file written by ``write``
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.events = []
+        self.pid = os.getpid()
+        self.t0 = time.perf_counter()
+
+    def complete(self, name: str, cat: str, start: float, end: float, args: dict = None):
+        """Add a span, start and end are time.perf_counter() values"""
+        e = {"name": name, "cat": cat, "ph": "X", "ts": round((start - self.t0) * 1e6, 1),
+             "dur": round((end - start) * 1e6, 1), "pid": self.pid, "tid": threading.get_ident()}
+        if args:
+            e["args"] = args
+        self.events.append(e)
+
+    def instant(self, name: str, cat: str, args: dict = None):
+        e = {"name": name, "cat": cat, "ph": "i", "s": "t", "ts": round((time.perf_counter() - self.t0) * 1e6, 1),
+             "pid": self.pid, "tid": threading.get_ident()}
+        if args:
+            e["args"] = args
+        self.events.append(e)
+
+    def write(self):
+        meta = [{"name": "process_name", "ph": "M", "pid": self.pid, "args": {"name": "burbnbot"}}]
+        with open(self.path, "w") as f:
+            json.dump({"traceEvents": meta + self.events, "displayTimeUnit": "ms"}, f)
+
+
+class _Span(object):
+    __slots__ = ("tracer", "name", "cat", "args", "start")
+
+    def __init__(self, tracer: Tracer, name: str, cat: str, args: dict):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def set(self, **args):
+        """Add arguments known once the span is running, e.g. a result"""
+        self.args.update(args)
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.complete(self.name, self.cat, self.start, time.perf_counter(), self.args)
+
+
+class _NoSpan(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def set(self, **args):
+        pass
+
+    def __exit__(self, exc_type, exc, tb):
+        return None
+
+
+_NO_SPAN = _NoSpan()
+_active: Optional[Tracer] = None
+
+
+def start(path: str) -> Tracer:
+    """Start recording, the trace is written to path when the process exits"""
+    global _active
+    if _active is None:
+        _active = Tracer(path)
+        atexit.register(stop)
+    return _active
+
+
+def stop():
+    """Write the trace and stop recording"""
+    global _active
+    if _active is not None:
+        _active.write()
+        _active = None
+
+
+def active() -> Optional[Tracer]:
+    return _active
+
+
+def span(name: str, cat: str = "step", **args):
+    """Context manager recording a span, no-op when tracing is off"""
+    if _active is None:
+        return _NO_SPAN
+    return _Span(_active, name, cat, args)
+
+
+def instant(name: str, cat: str = "step", **args):
+    """Record a single point in time, e.g. a list that stopped moving"""
+    if _active is not None:
+        _active.instant(name, cat, args)
@@ -0,0 +1,167 @@
+"""Sorted username snapshots on disk, memory-mapped for lookups and diffs.
+
+File layout, little-endian::
+
+    b"BBU1"  count:u32  offsets:u32[count + 1]  entries
+
+Each entry is ``length:u16`` followed by the UTF-8 username. Usernames are
+sorted by their UTF-8 bytes and unique, ``offsets[i]`` is where entry i
+starts counting from the beginning of the entries and ``offsets[count]`` is
+the size of the entries. The file is never loaded, a lookup reads
+log2(count) entries.
+"""
+import datetime
+import glob
+import mmap
+import os
+import struct
+from typing import Iterable, Iterator, List, Tuple
+
+MAGIC = b"BBU1"
+_HEADER = struct.Struct("<4sI")
+_OFFSET = struct.Struct("<I")
+_LENGTH = struct.Struct("<H")
+SUFFIX = ".users"
+
+
+def write_usernames(path: str, usernames: Iterable[str]) -> int:
+    """Write a snapshot, sorted and without duplicates, returns the number
+    of usernames. The file is replaced atomically.
+
+    Args:
+        path (str): destination file
+        usernames (iterable): usernames in any order
+    """
+    entries = sorted({u.encode("utf-8") for u in usernames})
+    offsets = [0]
+    for e in entries:
+        offsets.append(offsets[-1] + _LENGTH.size + len(e))
+    tmp = "{}.tmp".format(path)
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(entries)))
+        f.write(struct.pack("<{}I".format(len(offsets)), *offsets))
+        for e in entries:
+            f.write(_LENGTH.pack(len(e)))
+            f.write(e)
+    os.replace(tmp, path)
+    return len(entries)
+
+
+class UsernameSnapshot(object):
+    """Read-only view of a snapshot written by write_usernames
+
+    Args:
+        path (str): snapshot file
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.__file = open(path, "rb")
+        if os.fstat(self.__file.fileno()).st_size < _HEADER.size:
+            self.__file.close()
+            raise ValueError("{} is not a username snapshot".format(path))
+        self.__mm = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.__count = _HEADER.unpack_from(self.__mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError("{} is not a username snapshot".format(path))
+        self.__entries = _HEADER.size + _OFFSET.size * (self.__count + 1)
+
+    def close(self):
+        self.__mm.close()
+        self.__file.close()
+
+    def __enter__(self) -> "UsernameSnapshot":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.__count
+
+    def __raw(self, i: int) -> bytes:
+        start = self.__entries + _OFFSET.unpack_from(self.__mm, _HEADER.size + _OFFSET.size * i)[0]
+        length = _LENGTH.unpack_from(self.__mm, start)[0]
+        return self.__mm[start + _LENGTH.size:start + _LENGTH.size + length]
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += self.__count
+        if not 0 <= i < self.__count:
+            raise IndexError(i)
+        return self.__raw(i).decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        return (k.decode("utf-8") for k in self.keys())
+
+    def keys(self) -> Iterator[bytes]:
+        """UTF-8 usernames in file order"""
+        # entries are contiguous, walk them without the offset index
+        pos = self.__entries
+        for _ in range(self.__count):
+            length = _LENGTH.unpack_from(self.__mm, pos)[0]
+            pos += _LENGTH.size
+            yield self.__mm[pos:pos + length]
+            pos += length
+
+    def __contains__(self, username: str) -> bool:
+        key = username.encode("utf-8")
+        lo, hi = 0, self.__count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            v = self.__raw(mid)
+            if v == key:
+                return True
+            if v < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return False
+
+
+def diff(old: UsernameSnapshot, new: UsernameSnapshot) -> Iterator[Tuple[str, str]]:
+    """Walk both snapshots once, in order, and yield ("-", username) for the
+    ones only in old and ("+", username) for the ones only in new
+
+    Args:
+        old (UsernameSnapshot): e.g. yesterday's followers
+        new (UsernameSnapshot): e.g. today's followers
+    """
+    a, b = old.keys(), new.keys()
+    x, y = next(a, None), next(b, None)
+    while x is not None or y is not None:
+        if y is None or (x is not None and x < y):
+            yield "-", x.decode("utf-8")
+            x = next(a, None)
+        elif x is None or y < x:
+            yield "+", y.decode("utf-8")
+            y = next(b, None)
+        else:
+            x, y = next(a, None), next(b, None)
+
+
+def removed(old: UsernameSnapshot, new: UsernameSnapshot) -> Iterator[str]:
+    """Usernames in old and not in new, e.g. who unfollowed you"""
+    return (u for op, u in diff(old, new) if op == "-")
+
+
+def added(old: UsernameSnapshot, new: UsernameSnapshot) -> Iterator[str]:
+    """Usernames in new and not in old, e.g. new followers"""
+    return (u for op, u in diff(old, new) if op == "+")
+
+
+def snapshot_path(directory: str, kind: str, day: datetime.date = None) -> str:
+    """File of the snapshot of a list on a day
+
+    Args:
+        directory (str): where snapshots are kept
+        kind (str): store.FOLLOWING or store.FOLLOWERS
+        day (datetime.date): today if None
+    """
+    return os.path.join(directory, "{}-{}{}".format(kind, day or datetime.date.today(), SUFFIX))
+
+
+def snapshots(directory: str, kind: str) -> List[str]:
+    """Snapshot files of a list, oldest first"""
+    return sorted(glob.glob(os.path.join(directory, "{}-*{}".format(kind, SUFFIX))))
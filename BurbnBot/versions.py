@@ -0,0 +1,277 @@
+"""Selectors of the Instagram screens, per app version.
+
+Every selector the bot uses has a name, ``bot.sel.profile_tab`` is the
+selector of the profile tab for the Instagram version on the device. A
+selector is a dict of uiautomator2 keywords, so ``d(**sel.profile_tab)`` and
+``snapshot.find(**sel.profile_tab)`` work, and also a matcher compiled once
+that looks nodes up in a ScreenSnapshot and counts its hits and misses. Device
+queries are counted too when made through ``on``::
+
+    if bot.sel.grid_row.exists(s):
+        ...
+    bot.sel.profile_tab.on(bot.d).click()
+    print(bot.sel.report())  # selectors that never matched first
+
+The screen fingerprints (BurbnBot.screens), the parts of a feed post
+(BurbnBot.feed) and the screens the app is ready on (BurbnBot.navigation) are
+named selectors of the table as well, a version registered with other ids
+fixes them too.
+
+A new app version only lists what changed::
+
+    register("170.0.0.1.1", base="158.0.0.30.123",
+             search={"resourceId": "com.instagram.android:id/search_edit_text"})
+"""
+from typing import Dict, List, Optional, Tuple, Union
+
+from uiautomator2.exceptions import UiObjectNotFoundError
+
+from .snapshot import Node, ScreenSnapshot, compile_check
+
+_ID = "com.instagram.android:id/"
+
+#: keyword -> (ScreenSnapshot index, Node attribute), exact matches answered by an index
+_INDEXED = (("resourceId", "_by_id", "resource_id"), ("text", "_by_text", "text"),
+            ("description", "_by_desc", "description"), ("className", "_by_class", "class_name"))
+
+
+class Selector(dict):
+    """uiautomator2 selector keywords with a compiled snapshot matcher
+
+    Args:
+        name (str): name in the registry, shown in the report
+        stats (list): [hits, misses], shared with the selectors built by ``extend``
+        **selector: uiautomator2 keywords (resourceId, text, instance, ...)
+    """
+
+    def __init__(self, name: str, stats: List[int] = None, **selector):
+        super().__init__(selector)
+        self.name = name
+        self.stats = [0, 0] if stats is None else stats
+        self.__variants: Dict[frozenset, "Selector"] = {}
+        self.__instance: Optional[int] = selector.get("instance")
+        self.__index: Optional[Tuple[str, str, str]] = None  #: index, node attribute, value
+        checks = {k: v for k, v in selector.items() if k != "instance"}
+        for key, index, attr in _INDEXED:
+            if key in checks:
+                self.__index = (index, attr, checks.pop(key))
+                break
+        self.__checks = [compile_check(k, v) for k, v in checks.items()]
+
+    def extend(self, **selector) -> "Selector":
+        """This selector with more keywords, e.g. a text, compiled on first use"""
+        key = frozenset(selector.items())
+        sel = self.__variants.get(key)
+        if sel is None:
+            sel = Selector(self.name, self.stats, **dict(self, **selector))
+            if len(self.__variants) < 64:  # not one per username searched
+                self.__variants[key] = sel
+        return sel
+
+    def __nodes(self, pool) -> List[Node]:
+        checks = self.__checks
+        found = [n for n in pool if all(c(n) for c in checks)] if checks else list(pool)
+        if self.__instance is not None:
+            found = found[self.__instance:self.__instance + 1]
+        self.stats[0 if found else 1] += 1
+        return found
+
+    def find(self, s: ScreenSnapshot) -> List[Node]:
+        """Every node of the snapshot matching, in document order"""
+        if self.__index is None:
+            return self.__nodes(s.nodes)
+        index, _, value = self.__index
+        return self.__nodes(getattr(s, index).get(value, ()))
+
+    def first(self, s: ScreenSnapshot) -> Optional[Node]:
+        found = self.find(s)
+        return found[0] if found else None
+
+    def exists(self, s: ScreenSnapshot) -> bool:
+        return self.first(s) is not None
+
+    def count(self, s: ScreenSnapshot) -> int:
+        return len(self.find(s))
+
+    def get_text(self, s: ScreenSnapshot) -> Optional[str]:
+        node = self.first(s)
+        return None if node is None else node.text
+
+    def texts(self, s: ScreenSnapshot) -> List[str]:
+        return [n.text for n in self.find(s)]
+
+    def bounds(self, s: ScreenSnapshot):
+        node = self.first(s)
+        return None if node is None else node.bounds
+
+    def children(self, parent: Node) -> List[Node]:
+        """Descendants of parent matching, like ``UiObject.child``"""
+        if self.__index is None:
+            return self.__nodes(parent.descendants())
+        _, attr, value = self.__index
+        return self.__nodes(n for n in parent.descendants() if getattr(n, attr) == value)
+
+    @property
+    def resource_id(self) -> Optional[str]:
+        return self.get("resourceId")
+
+    def on(self, d) -> "_Counted":
+        """``d(**self)`` counting a hit when a query finds the element and a
+        miss when it raises UiObjectNotFoundError or tells it doesn't exist
+
+        Args:
+            d (uiautomator2.Device): device
+        """
+        return _Counted(d(**self), self.stats)
+
+
+class _Counted(object):
+    """Proxy of a UiObject counting the hits and misses of its selector"""
+
+    def __init__(self, target, stats: List[int]):
+        self.__target = target
+        self.__stats = stats
+
+    @property
+    def exists(self) -> bool:
+        found = bool(self.__target.exists)
+        self.__stats[0 if found else 1] += 1
+        return found
+
+    def __getitem__(self, instance: int) -> "_Counted":
+        return _Counted(self.__target[instance], self.__stats)
+
+    def __getattr__(self, name: str):
+        value = getattr(self.__target, name)
+        if not callable(value):
+            return value
+
+        def call(*args, **kwargs):
+            try:
+                result = value(*args, **kwargs)
+            except UiObjectNotFoundError:
+                self.__stats[1] += 1
+                raise
+            # wait(), click_exists() and the like tell a miss by returning False
+            self.__stats[0 if result is not False else 1] += 1
+            return result
+
+        return call
+
+
+class Selectors(object):
+    """The selectors of one app version
+
+    Args:
+        version (str): app version the selectors are for
+        table (dict): name -> uiautomator2 keywords, or an XPath string
+        exact (bool): False if the app on the device is another version
+    """
+
+    def __init__(self, version: str, table: Dict[str, Union[dict, str]], exact: bool = True):
+        self.version = version
+        self.exact = exact
+        self.__table: Dict[str, Union[Selector, str]] = {
+            name: v if isinstance(v, str) else Selector(name, **v) for name, v in table.items()}
+
+    def __getattr__(self, name: str) -> Union[Selector, str]:
+        try:
+            return self.__table[name]
+        except KeyError:
+            raise AttributeError("No selector {!r} for Instagram {}".format(name, self.version))
+
+    def report(self) -> Dict[str, dict]:
+        """Hits and misses of every selector looked up in a snapshot or queried
+        through ``on``, the ones that never matched first: they are the likely
+        broken by an update"""
+        r = {s.name: {"hits": s.stats[0], "misses": s.stats[1]} for s in self.__table.values()
+             if isinstance(s, Selector) and any(s.stats)}
+        return dict(sorted(r.items(), key=lambda i: (i[1]["hits"] > 0, -i[1]["misses"], i[0])))
+
+    def stale(self) -> List[str]:
+        """Selectors looked up that never matched"""
+        return [name for name, r in self.report().items() if not r["hits"]]
+
+
+def _ids(**names: str) -> Dict[str, dict]:
+    return {name: {"resourceId": _ID + rid} for name, rid in names.items()}
+
+
+#: version -> selector table, XPath expressions are plain strings
+VERSIONS: Dict[str, Dict[str, Union[dict, str]]] = {}
+_latest: Dict[str, Selectors] = {}  #: selectors of the newest version, see latest
+
+
+def register(version: str, base: str = None, **selectors: Union[dict, str]):
+    """Add the selectors of an app version
+
+    Args:
+        version (str): versionName reported by ``app_info``
+        base (str): version whose selectors are reused, only the changed
+            ones are given
+        **selectors: name -> uiautomator2 keywords or XPath string
+    """
+    VERSIONS[version] = dict(VERSIONS[base] if base is not None else {}, **selectors)
+    _latest.clear()
+
+
+register(
+    "158.0.0.30.123",
+    **_ids(tab_bar="tab_bar", tab_icon="tab_icon", profile_tab="profile_tab", notification_tab="notification",
+           settings="menu_settings_row", settings_item="row_simple_text_textview", title="action_bar_textview_title",
+           menu_title="title", login_username="login_username", login_password="password",
+           login_submit="button_text", grid_row="media_set_row_content_identifier", grid_image="image_button",
+           load_more="row_load_more_button", button="button", post_author="row_feed_photo_profile_name",
+           save_button="row_feed_button_save", posts_count="row_profile_header_textview_post_count",
+           followers_count="row_profile_header_textview_followers_count",
+           following_count="row_profile_header_textview_following_count",
+           profile_follow_button="profile_header_follow_button", profile_pager="profile_viewpager",
+           following_container="row_profile_header_following_container",
+           followers_container="row_profile_header_followers_container", hashtag_media_count="hashtag_media_count",
+           list_username="follow_list_username", list_row="follow_list_container", list_header="row_header_textview",
+           search="row_search_edit_text", sort_entry="sorting_entry_row_icon",
+           sort_option="follow_list_sorting_option_radio_button", sort_label="sorting_entry_row_option",
+           collection_name="collection_name", collection_image="selectable_image",
+           new_collection="save_to_collection_new_collection_button",
+           collection_name_edit="create_collection_edit_text", collection_save="save_to_collection_action_button",
+           notification_row="row_text", hashtags_entry="row_hashtag_image", hashtag_follow_button="follow_button",
+           hashtag_image="follow_list_user_imageview", device_body="body_message_device",
+           device_title="title_message", dialog_title="default_dialog_title", dialog_body="dialog_body",
+           camera="pre_capture_buttons_top_container", profile_avatar="profile_header_avatar_container_top_left_stub",
+           feed_container="refreshable_container", page_title="action_bar_new_title_container",
+           like_button="row_feed_button_like", post_photo="row_feed_photo_imageview",
+           carousel="carousel_media_group", sponsored_label="secondary_label"),
+    options={"description": "Options"},
+    thumbnail={"className": "android.widget.ImageView"},
+    post_list="//*[@resource-id='android:id/list']//*[@class='android.widget.FrameLayout'][2]",
+    other_session='//*[@resource-id="android:id/list"]/android.widget.LinearLayout[2]/android.widget.ImageView[2]',
+)
+
+
+def _version_key(version: str) -> tuple:
+    return tuple(int(p) if p.isdigit() else 0 for p in version.split("."))
+
+
+def for_version(version: str) -> Selectors:
+    """Selectors for an app version: its own, or those of the newest known
+    version older than it, or of the oldest known one
+
+    Args:
+        version (str): versionName reported by ``app_info``
+    """
+    if version in VERSIONS:
+        return Selectors(version, VERSIONS[version])
+    known = sorted(VERSIONS, key=_version_key)
+    older = [v for v in known if _version_key(v) <= _version_key(version or "")]
+    chosen = older[-1] if older else known[0]
+    return Selectors(chosen, VERSIONS[chosen], exact=False)
+
+
+def latest() -> Selectors:
+    """Selectors of the newest registered version, used by the helpers that
+    are given none"""
+    version = max(VERSIONS, key=_version_key)
+    if version not in _latest:
+        _latest.clear()
+        _latest[version] = Selectors(version, VERSIONS[version])
+    return _latest[version]
@@ -0,0 +1,111 @@
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from . import tracing
+from .clock import delay
+from .snapshot import ScreenSnapshot
+
+
+class Settle(NamedTuple):
+    """How long a screen took to be ready"""
+    label: str
+    seconds: float
+    polls: int
+    ok: bool
+
+
+class Waiter(object):
+    """Polls the screen until a condition holds instead of sleeping a fixed
+    time, and keeps how long each wait actually took
+
+    Args:
+        d (uiautomator2.Device): device
+        sleep (callable): function used to sleep between polls
+        timeout (float): default seconds to give up after
+        interval (float): default seconds between polls
+    """
+
+    def __init__(self, d, sleep: Callable[[float], None] = time.sleep, timeout: float = 10.0, interval: float = 0.5):
+        self.d = d
+        self.sleep = sleep
+        self.timeout = timeout
+        self.interval = interval
+        self.log: List[Settle] = []
+
+    @delay
+    def until(self, condition: Callable[[ScreenSnapshot], bool], timeout: float = None, interval: float = None,
+              label: str = "") -> Optional[ScreenSnapshot]:
+        """Dump the screen until condition(snapshot) is true
+
+        Args:
+            condition (callable): receives each ScreenSnapshot
+            timeout (float): seconds to give up after
+            interval (float): seconds between polls
+            label (str): name of the wait in the log
+
+        Returns:
+            ScreenSnapshot: the screen that satisfied the condition, None on timeout
+        """
+        timeout = self.timeout if timeout is None else timeout
+        interval = self.interval if interval is None else interval
+        start = time.monotonic()
+        slept = 0.0
+        polls = 0
+        with tracing.span("wait {}".format(label), "wait") as span:
+            while True:
+                s = ScreenSnapshot.from_device(self.d)
+                polls += 1
+                elapsed = max(time.monotonic() - start, slept)
+                if condition(s):
+                    self.log.append(Settle(label, elapsed, polls, True))
+                    span.set(polls=polls, ok=True)
+                    return s
+                if elapsed >= timeout:
+                    self.log.append(Settle(label, elapsed, polls, False))
+                    span.set(polls=polls, ok=False)
+                    return None
+                self.sleep(interval)
+                slept += interval
+
+    @delay
+    def element(self, timeout: float = None, label: str = None, **selector) -> Optional[ScreenSnapshot]:
+        """Wait until an element matching the selector is on screen"""
+        return self.until(lambda s: s.exists(**selector), timeout=timeout,
+                          label=label or "element {}".format(selector))
+
+    @delay
+    def any_element(self, selectors: List[dict], timeout: float = None, label: str = "") -> Optional[ScreenSnapshot]:
+        """Wait until one of the selectors matches"""
+        return self.until(lambda s: any(s.exists(**sel) for sel in selectors), timeout=timeout, label=label)
+
+    @delay
+    def stable(self, timeout: float = None, interval: float = None, label: str = "stable") -> Optional[ScreenSnapshot]:
+        """Wait until two consecutive dumps are identical"""
+        last = [None]
+
+        def unchanged(s: ScreenSnapshot) -> bool:
+            same = s.xml == last[0]
+            last[0] = s.xml
+            return same
+
+        return self.until(unchanged, timeout=timeout, interval=interval, label=label)
+
+    @delay
+    def rows_grow(self, count: int, timeout: float = None, label: str = "rows", **selector) -> Optional[ScreenSnapshot]:
+        """Wait until more than count elements match the selector"""
+        return self.until(lambda s: s.count(**selector) > count, timeout=timeout, label=label)
+
+    def report(self) -> Dict[str, dict]:
+        """Seconds spent and number of waits per label"""
+        r = {}
+        for w in self.log:
+            e = r.setdefault(w.label, {"waits": 0, "seconds": 0.0, "timeouts": 0})
+            e["waits"] += 1
+            e["seconds"] += w.seconds
+            e["timeouts"] += 0 if w.ok else 1
+        return r
+
+    @property
+    def total(self) -> float:
+        """Seconds spent waiting for screens"""
+        return sum(w.seconds for w in self.log)
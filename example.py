@@ -8,9 +8,8 @@ users_following = bot.get_following_list()
 # get the followers list (take a long time)
 users_followers = bot.get_followers_list()
 
-for user in [u for u in users_following if u not in users_followers]:
-    # unfollow who don't follow you back
-    bot.unfollow(username=user)
+# unfollow who don't follow you back, opening the following list only once
+bot.bulk_unfollow(bot.non_followers(users_following, users_followers))
 
 # Open hashtag's feed 'creative',
 # move to Recent tab and